@@ -10,22 +10,79 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite+aiosqlite:///./chess.db"
+    DATABASE_READ_URL: str = ""  # Defaults to DATABASE_URL (e.g. point at a replica)
+    DATABASE_ECHO: bool = False  # Log every SQL statement
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 20
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    MOVE_WRITER_BATCH_SIZE: int = 500  # Buffered moves that trigger a flush
+    MOVE_WRITER_FLUSH_SECONDS: float = 0.5
+    MOVE_WRITER_MAX_BUFFER: int = 100_000  # While the database is unavailable; oldest dropped beyond this
     
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_PASSWORD: str = ""
+    GAME_STATE_TTL_SECONDS: int = 24 * 3600  # Idle active games expire from Redis
+    GAME_WARMUP_ON_STARTUP: bool = False  # Restore all active games into Redis at startup
+    GAME_INACTIVE_TTL_SECONDS: int = 300  # Finished/unknown game ids answered without the database
+    GAME_MEMORY_BUDGET_MB: int = 256  # Resident games per worker; the rest live only in Redis
+    GAME_SPILL_IDLE_SECONDS: float = 300.0  # Untouched this long, a game is dropped from memory
+    GAME_SPILL_INTERVAL_SECONDS: float = 5.0
     
     # JWT
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    PRINCIPAL_CACHE_SIZE: int = 10_000  # Authenticated users cached per worker
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+    PASSWORD_HASH_WORKERS: int = 2  # bcrypt worker processes
+    PASSWORD_HASH_MAX_PENDING: int = 64  # Beyond this, auth requests get 429
     
     # Matchmaking
     MATCHMAKING_TIMEOUT_SECONDS: int = 10
+    MATCHMAKING_TICK_SECONDS: float = 1.0  # Matcher sweep interval while search windows widen
+    MATCHMAKING_GRACE_SECONDS: float = 5.0  # Extra wait for a game after being paired at timeout
+    MATCHMAKING_WINDOW_BASE: int = 25  # Initial points window
+    MATCHMAKING_WINDOW_GROWTH: int = 25  # Window growth per second waited
+    MATCHMAKING_WINDOW_MAX: int = 500
+    MATCHMAKING_SWEEP_BATCH: int = 200  # Oldest entries examined per sweep
+    MATCHMAKING_CANDIDATES: int = 8  # Neighbours examined on each side of a rating
+    
+    # Game clocks
+    GAME_BASE_SECONDS: int = 0  # Per side; 0 for untimed games (the web client shows no clock yet)
+    GAME_INCREMENT_SECONDS: int = 5
+    GAME_ABANDON_SECONDS: float = 120.0  # A player gone this long forfeits
+    TIMER_WHEEL_TICK_SECONDS: float = 0.1  # Timer resolution
+    
+    # WebSocket
+    WS_SEND_QUEUE_SIZE: int = 64  # Frames buffered per connection before it is evicted
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0  # A single send stalled this long closes the socket
+    WS_REPLAY_BUFFER_SIZE: int = 256  # Game events kept per game for resuming clients
+    SPECTATOR_MAX_PER_GAME: int = 10_000  # Across all workers
+    SPECTATOR_BUFFER_SIZE: int = 8  # Frames per viewer before it is coalesced onto a snapshot
+    SPECTATOR_FANOUT_BATCH: int = 500  # Viewers served between event loop yields
+    SPECTATOR_HEARTBEAT_SECONDS: float = 10.0  # A dead worker's viewers stop counting after 3 missed beats
     
     # Stockfish
     STOCKFISH_PATH: str = "/usr/local/bin/stockfish"  # Update based on your system
     STOCKFISH_DEPTH: int = 10
+    STOCKFISH_POOL_SIZE: int = 2  # Engine processes per worker
+    STOCKFISH_THREADS: int = 1  # Threads per engine process
+    STOCKFISH_MAX_PENDING: int = 64  # Requests beyond this fall back to a random move
+    STOCKFISH_TIMEOUT_SECONDS: float = 5.0
+    
+    # Position cache (engine results)
+    POSITION_CACHE_SIZE: int = 100_000  # In-process LRU entries
+    POSITION_CACHE_REDIS: bool = True  # Share results across nodes through Redis
+    POSITION_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    OPENING_BOOK_PATH: str = ""  # Optional polyglot .bin book
+    
+    # Leaderboard
+    LEADERBOARD_CACHE_TTL_SECONDS: float = 2.0
+    LEADERBOARD_MAX_PAGE_SIZE: int = 100
+    LEADERBOARD_MAX_RADIUS: int = 25  # Players shown above/below in "around me"
     
     # Points
     WIN_POINTS: int = 10
@@ -1,20 +1,57 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from app.config import get_settings
 
 settings = get_settings()
 
+is_sqlite = settings.DATABASE_URL.startswith("sqlite")
+
+
+def _apply_sqlite_pragmas(sync_engine, read_only: bool):
+    @event.listens_for(sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+# Writes go through a single connection on SQLite (one writer at a time anyway);
+# reads get their own pool and, with WAL, never block on the writer.
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=settings.DEBUG,
+    echo=settings.DATABASE_ECHO,
+    pool_size=1 if is_sqlite else settings.DATABASE_POOL_SIZE,
+    max_overflow=0 if is_sqlite else settings.DATABASE_MAX_OVERFLOW,
+)
+
+read_engine = create_async_engine(
+    settings.DATABASE_READ_URL or settings.DATABASE_URL,
+    echo=settings.DATABASE_ECHO,
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
 )
 
+if is_sqlite:
+    _apply_sqlite_pragmas(engine.sync_engine, read_only=False)
+    _apply_sqlite_pragmas(read_engine.sync_engine, read_only=True)
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
 
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 
@@ -26,6 +63,28 @@ async def get_db():
             await session.close()
 
 
+async def get_read_db():
+    """Session on the read engine, for endpoints that never write"""
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def _create_indexes(conn):
+    # create_all skips tables that already exist, so add new indexes explicitly
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_indexes)
+
+
+async def close_db():
+    await engine.dispose()
+    await read_engine.dispose()
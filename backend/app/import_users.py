@@ -0,0 +1,45 @@
+import argparse
+import asyncio
+import sys
+import time
+
+from app.database import init_db, close_db
+from app.redis_client import close_redis
+from app.services.user_import import ImportReport, import_users, read_rows
+
+
+async def run(path: str, batch_size: int, workers: int | None) -> ImportReport:
+    await init_db()
+    start = time.perf_counter()
+
+    def progress(report: ImportReport):
+        elapsed = time.perf_counter() - start
+        print(
+            f"{report.processed} rows read, {report.imported} imported, "
+            f"{len(report.failed)} failed ({elapsed:.1f}s)",
+            flush=True,
+        )
+
+    try:
+        return await import_users(read_rows(path), batch_size, workers, progress)
+    finally:
+        await close_redis()
+        await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import users from a CSV or NDJSON file")
+    parser.add_argument("path", help="File with username, email, password and optional points columns")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="Password hashing processes (default: CPU count)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.path, args.batch_size, args.workers))
+    for row_number, reason in report.failed:
+        print(f"row {row_number}: {reason}", file=sys.stderr)
+    print(f"Done: {report.imported} imported, {len(report.failed)} failed")
+    sys.exit(1 if report.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
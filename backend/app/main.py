@@ -1,13 +1,15 @@
 from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI, WebSocket, Query
 from fastapi.middleware.cors import CORSMiddleware
 from jose import jwt, JWTError
 
 from app.config import get_settings
-from app.database import init_db
+from app.database import init_db, close_db
 from app.redis_client import get_redis, close_redis
+from app.services import matchmaking_engine, engine_pool, position_cache, move_writer, warm_active_games, principal_cache, password_hasher, timer_wheel, game_spiller
 from app.routers import auth_router, game_router, leaderboard_router
-from app.websocket import handle_game_websocket
+from app.websocket import handle_game_websocket, handle_spectator_websocket, manager, spectator_hub
 
 settings = get_settings()
 
@@ -16,10 +18,33 @@ settings = get_settings()
 async def lifespan(app: FastAPI):
     # Startup
     await init_db()
-    await get_redis()  # Initialize Redis connection
+    redis_client = await get_redis()  # Initialize Redis connection
+    await matchmaking_engine.start(redis_client)
+    await manager.start(redis_client)
+    await spectator_hub.start(redis_client)
+    await engine_pool.start()
+    await move_writer.start()
+    timer_wheel.start()
+    game_spiller.start()
+    if settings.GAME_WARMUP_ON_STARTUP:
+        await warm_active_games()
+    if settings.POSITION_CACHE_REDIS:
+        position_cache.attach_redis(redis_client)
+    if settings.OPENING_BOOK_PATH:
+        position_cache.load_book(settings.OPENING_BOOK_PATH)
     yield
     # Shutdown
+    await matchmaking_engine.stop()
+    await manager.stop()
+    await spectator_hub.stop()
+    await timer_wheel.stop()
+    await game_spiller.stop()
+    await engine_pool.close()
+    position_cache.close()
+    await move_writer.stop()
+    password_hasher.shutdown()
     await close_redis()
+    await close_db()
 
 
 app = FastAPI(
@@ -59,30 +84,65 @@ async def health():
     redis_ok = await redis.ping()
     return {
         "status": "healthy",
-        "redis": "connected" if redis_ok else "disconnected"
+        "redis": "connected" if redis_ok else "disconnected",
+        "position_cache": position_cache.stats(),
+        "move_writer": move_writer.stats(),
+        "principal_cache": principal_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "websockets": manager.stats(),
+        "timers": timer_wheel.stats(),
+        "spectators": spectator_hub.stats()
     }
 
 
-@app.websocket("/ws/game/{game_id}")
-async def websocket_endpoint(
-    websocket: WebSocket,
-    game_id: int,
-    token: str = Query(...)
-):
-    """WebSocket endpoint for real-time chess gameplay"""
-    
-    # Verify token
+async def authenticate_websocket(websocket: WebSocket, token: str) -> Optional[int]:
+    """User id from the token, or None after closing the socket with 4001"""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
         user_id = payload.get("sub")
         if not user_id:
             await websocket.close(code=4001, reason="Invalid token")
-            return
+            return None
         # Convert to int (JWT stores sub as string)
-        user_id = int(user_id)
+        return int(user_id)
     except (JWTError, ValueError):
         await websocket.close(code=4001, reason="Invalid token")
+        return None
+
+
+@app.get("/health/games")
+async def game_memory():
+    """Resident and spilled game counts on this worker, with modelled and sampled (estimated) bytes per game"""
+    return game_spiller.stats()
+
+
+@app.websocket("/ws/game/{game_id}")
+async def websocket_endpoint(
+    websocket: WebSocket,
+    game_id: int,
+    token: str = Query(...),
+    since: Optional[int] = Query(None, ge=0, description="Last event seq seen, to resume")
+):
+    """WebSocket endpoint for real-time chess gameplay"""
+    
+    # Verify token
+    user_id = await authenticate_websocket(websocket, token)
+    if user_id is None:
         return
     
     # Handle game WebSocket
-    await handle_game_websocket(websocket, game_id, user_id)
+    await handle_game_websocket(websocket, game_id, user_id, since)
+
+
+@app.websocket("/ws/game/{game_id}/watch")
+async def spectator_endpoint(
+    websocket: WebSocket,
+    game_id: int,
+    token: str = Query(...)
+):
+    """WebSocket endpoint for watching a game"""
+    
+    if await authenticate_websocket(websocket, token) is None:
+        return
+    
+    await handle_spectator_websocket(websocket, game_id)
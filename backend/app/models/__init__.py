@@ -1,3 +1,3 @@
-from app.models.user import User, Game, GameMove
+from app.models.user import User, Game, GameMove, GameLog
 
-__all__ = ["User", "Game", "GameMove"]
+__all__ = ["User", "Game", "GameMove", "GameLog"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -37,6 +37,14 @@ class Game(Base):
     white_player = relationship("User", foreign_keys=[white_player_id], back_populates="games_as_white")
     black_player = relationship("User", foreign_keys=[black_player_id], back_populates="games_as_black")
     moves = relationship("GameMove", back_populates="game", cascade="all, delete-orphan")
+    log = relationship("GameLog", back_populates="game", uselist=False, cascade="all, delete-orphan")
+    
+    # Per-player game lists are paged newest-first by id
+    __table_args__ = (
+        Index("ix_games_white_player_id_id", "white_player_id", "id"),
+        Index("ix_games_black_player_id_id", "black_player_id", "id"),
+        Index("ix_games_status", "status"),
+    )
 
 
 class GameMove(Base):
@@ -52,3 +60,20 @@ class GameMove(Base):
     
     # Relationships
     game = relationship("Game", back_populates="moves")
+    
+    __table_args__ = (
+        Index("ix_game_moves_game_id_move_number", "game_id", "move_number"),
+    )
+
+
+class GameLog(Base):
+    """Compact move log of a finished game (replaces its GameMove rows)"""
+    __tablename__ = "game_logs"
+    
+    game_id = Column(Integer, ForeignKey("games.id"), primary_key=True)
+    moves = Column(LargeBinary, nullable=False)  # 16 bits per ply, see services/move_log.py
+    keyframes = Column(Text, nullable=False)  # Newline-separated FENs every N plies
+    ply_count = Column(Integer, nullable=False)
+    
+    # Relationships
+    game = relationship("Game", back_populates="log")
@@ -3,29 +3,42 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_read_db
 from app.redis_client import get_redis
 from app.config import get_settings
 from app.models import User
 from app.schemas import UserCreate, UserResponse, Token, TokenData
-from app.services import add_to_leaderboard
+from app.services import add_to_leaderboard, principal_cache, password_hasher, PasswordPoolBusy
 
 settings = get_settings()
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def _password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many authentication requests, try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
@@ -39,10 +52,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     return encoded_jwt
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
-) -> User:
+def decode_token(token: str) -> TokenData:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -55,23 +65,45 @@ async def get_current_user(
             raise credentials_exception
         # Convert to int if it's a string or already int
         user_id = int(user_id)
-        token_data = TokenData(user_id=user_id)
+        return TokenData(user_id=user_id, username=payload.get("username"))
     except (JWTError, ValueError):
         raise credentials_exception
+
+
+async def get_current_claims(token: str = Depends(oauth2_scheme)) -> TokenData:
+    """Authenticate from the token alone, for endpoints that only need the user id/username"""
+    return decode_token(token)
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_read_db)
+) -> User:
+    token_data = decode_token(token)
+    
+    user = principal_cache.get(token_data.user_id, token)
+    if user is not None:
+        return user
     
     result = await db.execute(select(User).where(User.id == token_data.user_id))
     user = result.scalar_one_or_none()
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    principal_cache.put(user.id, token, user)
     return user
 
 
 @router.post("/register", response_model=UserResponse)
 async def register(
     user_data: UserCreate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    # Check if username exists
+    # Uniqueness checks on the read engine: the writer is a single connection
+    # on SQLite and must not be held while the password is hashed
     result = await db.execute(select(User).where(User.username == user_data.username))
     if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Username already registered")
@@ -80,18 +112,24 @@ async def register(
     result = await db.execute(select(User).where(User.email == user_data.email))
     if result.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Email already registered")
+    await db.close()
     
     # Create user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     db_user = User(
         username=user_data.username,
         email=user_data.email,
         password_hash=hashed_password,
         points=0
     )
-    db.add(db_user)
-    await db.commit()
-    await db.refresh(db_user)
+    async with AsyncSessionLocal() as write_db:
+        write_db.add(db_user)
+        try:
+            await write_db.commit()
+        except IntegrityError:
+            # Registered concurrently since the checks above
+            raise HTTPException(status_code=400, detail="Username or email already registered")
+        await write_db.refresh(db_user)
     
     # Add to leaderboard
     redis_client = await get_redis()
@@ -103,13 +141,13 @@ async def register(
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     # Find user
     result = await db.execute(select(User).where(User.username == form_data.username))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await verify_password(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -1,14 +1,21 @@
+import chess
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, literal, union_all
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.redis_client import get_redis
-from app.models import User, Game, GameMove
-from app.schemas import GameResponse, MatchmakingResponse
-from app.routers.auth import get_current_user
-from app.services import MatchmakingService, create_game, get_game
+from app.models import User, Game, GameMove, GameLog
+from app.schemas import GameResponse, GameSummary, GameListResponse, MatchmakingResponse, TokenData
+from app.routers.auth import get_current_user, get_current_claims
+from app.websocket import spectator_hub, schedule_abandon_check
+from app.services import (
+    MatchmakingService, create_game, get_game, move_log,
+    stream_moves_ndjson, stream_games_pgn
+)
 
 router = APIRouter(prefix="/game", tags=["Game"])
 
@@ -22,7 +29,7 @@ async def find_match(
     redis_client = await get_redis()
     matchmaking = MatchmakingService(redis_client)
     
-    result = await matchmaking.find_match(current_user.id, current_user.username)
+    result = await matchmaking.find_match(current_user.id, current_user.username, current_user.points or 0)
     
     if result["status"] == "matched":
         # Check if game already exists (Player 2 case - notified about existing game)
@@ -47,12 +54,14 @@ async def find_match(
         await db.refresh(db_game)
         
         # Create in-memory game
-        create_game(
+        await create_game(
             game_id=db_game.id,
             white_player_id=db_game.white_player_id,
             black_player_id=db_game.black_player_id,
             is_bot_game=False
         )
+        # Reaped if nobody ever connects
+        schedule_abandon_check(db_game.id)
         
         # Notify opponent with game_id
         if "other_entry_id" in result:
@@ -83,12 +92,13 @@ async def find_match(
         await db.refresh(db_game)
         
         # Create in-memory game
-        create_game(
+        await create_game(
             game_id=db_game.id,
             white_player_id=db_game.white_player_id,
             black_player_id=None,
             is_bot_game=True
         )
+        schedule_abandon_check(db_game.id)
         
         return MatchmakingResponse(
             status="bot_game",
@@ -100,11 +110,100 @@ async def find_match(
     return MatchmakingResponse(status="searching")
 
 
+# Result that counts as a win/loss/draw for the given side
+OUTCOME_RESULTS = {
+    "white": {"win": "white_wins", "loss": "black_wins", "draw": "draw"},
+    "black": {"win": "black_wins", "loss": "white_wins", "draw": "draw"},
+}
+
+
+def _player_games(user_id: int, color: str, cursor, outcome, since, until, limit: int):
+    """Newest-first games where the user played one side (served by the (player, id) index)"""
+    player_col = Game.white_player_id if color == "white" else Game.black_player_id
+    opponent_col = Game.black_player_id if color == "white" else Game.white_player_id
+    query = select(
+        Game.id,
+        literal(color).label("color"),
+        opponent_col.label("opponent_id"),
+        Game.is_bot_game,
+        Game.status,
+        Game.result,
+        Game.created_at,
+        Game.completed_at,
+    ).where(player_col == user_id)
+    if cursor is not None:
+        query = query.where(Game.id < cursor)
+    if outcome is not None:
+        query = query.where(Game.result == OUTCOME_RESULTS[color][outcome])
+    if since is not None:
+        query = query.where(Game.created_at >= since)
+    if until is not None:
+        query = query.where(Game.created_at < until)
+    return select(query.order_by(Game.id.desc()).limit(limit).subquery())
+
+
+@router.get("/mine", response_model=GameListResponse)
+async def list_my_games(
+    cursor: Optional[int] = Query(None, ge=1, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    outcome: Optional[Literal["win", "loss", "draw"]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    claims: TokenData = Depends(get_current_claims),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """List the current user's games, newest first, with keyset pagination"""
+    # Each side is an index range scan; merge them and keep one page (+1 to detect more)
+    games = union_all(
+        _player_games(claims.user_id, "white", cursor, outcome, since, until, limit + 1),
+        _player_games(claims.user_id, "black", cursor, outcome, since, until, limit + 1),
+    ).subquery()
+    result = await db.execute(
+        select(games, User.username.label("opponent"))
+        .outerjoin(User, User.id == games.c.opponent_id)
+        .order_by(games.c.id.desc())
+        .limit(limit + 1)
+    )
+    rows = result.all()
+    
+    page = [
+        GameSummary(
+            id=row.id,
+            color=row.color,
+            opponent_id=row.opponent_id,
+            opponent=row.opponent,
+            is_bot_game=row.is_bot_game,
+            status=row.status,
+            result=row.result,
+            outcome=next((k for k, v in OUTCOME_RESULTS[row.color].items() if v == row.result), None),
+            created_at=row.created_at,
+            completed_at=row.completed_at,
+        )
+        for row in rows[:limit]
+    ]
+    next_cursor = page[-1].id if len(rows) > limit else None
+    return GameListResponse(games=page, next_cursor=next_cursor)
+
+
+@router.get("/export.pgn")
+async def export_my_games(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    claims: TokenData = Depends(get_current_claims)
+):
+    """Stream the current user's games as one PGN file"""
+    return StreamingResponse(
+        stream_games_pgn(claims.user_id, since, until),
+        media_type="application/x-chess-pgn",
+        headers={"Content-Disposition": f'attachment; filename="{claims.username}.pgn"'}
+    )
+
+
 @router.get("/{game_id}", response_model=GameResponse)
 async def get_game_info(
     game_id: int,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    claims: TokenData = Depends(get_current_claims),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get game details"""
     result = await db.execute(select(Game).where(Game.id == game_id))
@@ -114,7 +213,7 @@ async def get_game_info(
         raise HTTPException(status_code=404, detail="Game not found")
     
     # Check if user is part of this game
-    if game.white_player_id != current_user.id and game.black_player_id != current_user.id:
+    if game.white_player_id != claims.user_id and game.black_player_id != claims.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view this game")
     
     return game
@@ -123,51 +222,123 @@ async def get_game_info(
 @router.get("/{game_id}/history")
 async def get_game_history(
     game_id: int,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    ply: Optional[int] = Query(None, ge=0, description="Only return the position after this ply"),
+    claims: TokenData = Depends(get_current_claims),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get move history for a game"""
+    """Get move history for a game, or seek to a single ply"""
     result = await db.execute(select(Game).where(Game.id == game_id))
     game = result.scalar_one_or_none()
     
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     
-    # Get moves
-    result = await db.execute(
-        select(GameMove)
-        .where(GameMove.game_id == game_id)
-        .order_by(GameMove.move_number)
-    )
-    moves = result.scalars().all()
+    # Finished games are stored as a compact move log
+    result = await db.execute(select(GameLog).where(GameLog.game_id == game_id))
+    log = result.scalar_one_or_none()
     
-    # Get in-memory game state if active
-    mem_game = get_game(game_id)
+    if ply is not None:
+        if log:
+            if ply > log.ply_count:
+                raise HTTPException(status_code=404, detail="Ply not found")
+            fen = move_log.fen_at(log.moves, log.keyframes, ply)
+        elif ply == 0:
+            fen = chess.STARTING_FEN
+        else:
+            result = await db.execute(
+                select(GameMove.fen_after)
+                .where(GameMove.game_id == game_id, GameMove.move_number == ply)
+            )
+            fen = result.scalar_one_or_none()
+            if fen is None:
+                raise HTTPException(status_code=404, detail="Ply not found")
+        return {"game_id": game_id, "ply": ply, "fen": fen}
     
-    return {
-        "game_id": game_id,
-        "status": game.status,
-        "fen": mem_game.get_fen() if mem_game else None,
-        "moves": [
+    if log:
+        moves = list(move_log.iter_moves(log.moves))
+    else:
+        result = await db.execute(
+            select(GameMove)
+            .where(GameMove.game_id == game_id)
+            .order_by(GameMove.move_number)
+        )
+        moves = [
             {
                 "move_number": m.move_number,
                 "move_san": m.move_san,
                 "move_uci": m.move_uci,
                 "fen_after": m.fen_after
             }
-            for m in moves
+            for m in result.scalars().all()
         ]
+    
+    # Get in-memory game state if active
+    mem_game = await get_game(game_id)
+    
+    return {
+        "game_id": game_id,
+        "status": game.status,
+        "fen": mem_game.get_fen() if mem_game else None,
+        "moves": moves
     }
 
 
+@router.get("/{game_id}/moves.ndjson")
+async def stream_game_moves(
+    game_id: int,
+    claims: TokenData = Depends(get_current_claims),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Stream a game's moves as newline-delimited JSON"""
+    result = await db.execute(select(Game.id).where(Game.id == game_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    
+    # The stream opens its own session: dependencies are closed before the body is sent
+    return StreamingResponse(stream_moves_ndjson(game_id), media_type="application/x-ndjson")
+
+
+@router.get("/{game_id}/pgn", response_class=PlainTextResponse)
+async def get_live_pgn(
+    game_id: int,
+    claims: TokenData = Depends(get_current_claims),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """PGN of a game in progress"""
+    mem_game = await get_game(game_id)
+    
+    if not mem_game:
+        raise HTTPException(status_code=404, detail="Game not active")
+    
+    player_ids = [pid for pid in (mem_game.white_player_id, mem_game.black_player_id) if pid]
+    result = await db.execute(select(User.id, User.username).where(User.id.in_(player_ids)))
+    names = dict(result.all())
+    
+    return PlainTextResponse(
+        mem_game.get_pgn(
+            White=names.get(mem_game.white_player_id, "?"),
+            Black="Stockfish" if mem_game.is_bot_game else names.get(mem_game.black_player_id, "?")
+        ),
+        media_type="application/x-chess-pgn"
+    )
+
+
+@router.get("/{game_id}/spectators")
+async def get_spectator_count(
+    game_id: int,
+    claims: TokenData = Depends(get_current_claims)
+):
+    """Number of viewers watching a game"""
+    return {"game_id": game_id, "spectators": await spectator_hub.count(game_id)}
+
+
 @router.get("/{game_id}/state")
 async def get_game_state(
     game_id: int,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    claims: TokenData = Depends(get_current_claims)
 ):
     """Get current game state"""
-    mem_game = get_game(game_id)
+    mem_game = await get_game(game_id)
     
     if not mem_game:
         raise HTTPException(status_code=404, detail="Game not active")
@@ -177,6 +348,7 @@ async def get_game_state(
         "fen": mem_game.get_fen(),
         "turn": mem_game.get_current_turn(),
         "legal_moves": mem_game.get_legal_moves(),
+        "clock": mem_game.get_clock(),
         "is_game_over": mem_game.is_game_over(),
         "result": mem_game.get_result() if mem_game.is_game_over() else None
     }
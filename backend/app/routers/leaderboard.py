@@ -1,37 +1,50 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.redis_client import get_redis
 from app.models import User
-from app.schemas import LeaderboardEntry, LeaderboardResponse
-from app.routers.auth import get_current_user
-from app.services import get_top_players, get_player_rank, get_total_players
+from app.config import get_settings
+from app.schemas import TokenData, LeaderboardResponse, LeaderboardPageResponse, LeaderboardAroundResponse
+from app.routers.auth import get_current_user, get_current_claims
+from app.services import get_leaderboard_json, get_player_rank, get_leaderboard_page, get_players_around
 
+settings = get_settings()
 router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
 
 
 @router.get("", response_model=LeaderboardResponse)
-async def get_leaderboard(
-    limit: int = 10,
-    db: AsyncSession = Depends(get_db)
-):
+async def get_leaderboard(limit: int = Query(10, ge=1, le=settings.LEADERBOARD_MAX_PAGE_SIZE)):
     """Get top players leaderboard"""
     redis_client = await get_redis()
     
-    top_players = await get_top_players(redis_client, limit)
-    total = await get_total_players(redis_client)
-    
-    entries = [
-        LeaderboardEntry(
-            rank=p["rank"],
-            username=p["username"],
-            points=p["points"]
-        )
-        for p in top_players
-    ]
+    # Pre-serialized snapshot, returned as-is
+    payload = await get_leaderboard_json(redis_client, limit)
+    return Response(content=payload, media_type="application/json")
+
+
+@router.get("/page", response_model=LeaderboardPageResponse)
+async def get_leaderboard_page_endpoint(
+    cursor: int = Query(0, ge=0, description="Rank offset returned as next_cursor by the previous page"),
+    limit: int = Query(50, ge=1, le=settings.LEADERBOARD_MAX_PAGE_SIZE)
+):
+    """Get one page of the leaderboard"""
+    redis_client = await get_redis()
+    return await get_leaderboard_page(redis_client, cursor, limit)
+
+
+@router.get("/around-me", response_model=LeaderboardAroundResponse)
+async def get_leaderboard_around_me(
+    radius: int = Query(5, ge=0, le=settings.LEADERBOARD_MAX_RADIUS),
+    claims: TokenData = Depends(get_current_claims)
+):
+    """Get the players ranked just above and below the current user"""
+    redis_client = await get_redis()
     
-    return LeaderboardResponse(entries=entries, total_players=total)
+    around = await get_players_around(redis_client, claims.user_id, claims.username, radius)
+    if not around:
+        raise HTTPException(status_code=404, detail="Not ranked yet")
+    return around
 
 
 @router.get("/me")
@@ -1,13 +1,15 @@
 from app.schemas.user import (
     UserBase, UserCreate, UserLogin, UserResponse, 
     Token, TokenData,
-    GameCreate, GameResponse, GameMoveCreate, GameMoveResponse,
-    MatchmakingResponse, LeaderboardEntry, LeaderboardResponse
+    GameCreate, GameResponse, GameSummary, GameListResponse, GameMoveCreate, GameMoveResponse,
+    MatchmakingResponse, LeaderboardEntry, LeaderboardResponse,
+    LeaderboardPageResponse, LeaderboardAroundResponse
 )
 
 __all__ = [
     "UserBase", "UserCreate", "UserLogin", "UserResponse",
     "Token", "TokenData",
-    "GameCreate", "GameResponse", "GameMoveCreate", "GameMoveResponse",
-    "MatchmakingResponse", "LeaderboardEntry", "LeaderboardResponse"
+    "GameCreate", "GameResponse", "GameSummary", "GameListResponse", "GameMoveCreate", "GameMoveResponse",
+    "MatchmakingResponse", "LeaderboardEntry", "LeaderboardResponse",
+    "LeaderboardPageResponse", "LeaderboardAroundResponse"
 ]
@@ -55,6 +55,24 @@ class GameResponse(BaseModel):
         from_attributes = True
 
 
+class GameSummary(BaseModel):
+    id: int
+    color: str  # white, black
+    opponent_id: Optional[int]
+    opponent: Optional[str]  # None for bot games
+    is_bot_game: bool
+    status: str
+    result: Optional[str]
+    outcome: Optional[str]  # win, loss, draw (from this player's side)
+    created_at: datetime
+    completed_at: Optional[datetime]
+
+
+class GameListResponse(BaseModel):
+    games: list[GameSummary]
+    next_cursor: Optional[int] = None
+
+
 class GameMoveCreate(BaseModel):
     move: str  # UCI format like "e2e4"
 
@@ -89,3 +107,15 @@ class LeaderboardEntry(BaseModel):
 class LeaderboardResponse(BaseModel):
     entries: list[LeaderboardEntry]
     total_players: int
+
+
+class LeaderboardPageResponse(BaseModel):
+    entries: list[LeaderboardEntry]
+    total_players: int
+    next_cursor: Optional[int] = None
+
+
+class LeaderboardAroundResponse(BaseModel):
+    entries: list[LeaderboardEntry]
+    total_players: int
+    rank: int
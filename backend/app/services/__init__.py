@@ -1,17 +1,35 @@
 from app.services.leaderboard import (
-    add_to_leaderboard, update_points, get_top_players, 
-    get_player_rank, get_total_players
+    add_to_leaderboard, update_points, update_points_many, get_top_players, 
+    get_player_rank, get_total_players, get_leaderboard_json,
+    get_leaderboard_page, get_players_around
 )
-from app.services.matchmaking import MatchmakingService
+from app.services.matchmaking import MatchmakingService, MatchmakingEngine, matchmaking_engine
 from app.services.chess_game import (
-    ChessGame, create_game, get_game, remove_game, active_games
+    ChessGame, create_game, get_game, save_move, remove_game, reinstate_game, active_games,
+    warm_active_games, GameSpiller, game_spiller
 )
-from app.services.stockfish import StockfishService
+from app.services.move_writer import MoveWriter, move_writer
+from app.services import move_log
+from app.services.game_export import stream_moves_ndjson, stream_games_pgn
+from app.services.position_cache import PositionCache, position_cache
+from app.services.principal_cache import PrincipalCache, principal_cache
+from app.services.password_hasher import PasswordHasher, PasswordPoolBusy, password_hasher
+from app.services.timer_wheel import TimerWheel, timer_wheel
+from app.services.stockfish import StockfishService, EnginePool, EnginePoolBusy, engine_pool
 
 __all__ = [
-    "add_to_leaderboard", "update_points", "get_top_players",
-    "get_player_rank", "get_total_players",
-    "MatchmakingService",
-    "ChessGame", "create_game", "get_game", "remove_game", "active_games",
-    "StockfishService"
+    "add_to_leaderboard", "update_points", "update_points_many", "get_top_players",
+    "get_player_rank", "get_total_players", "get_leaderboard_json",
+    "get_leaderboard_page", "get_players_around",
+    "MatchmakingService", "MatchmakingEngine", "matchmaking_engine",
+    "ChessGame", "create_game", "get_game", "save_move", "remove_game", "reinstate_game", "active_games",
+    "warm_active_games", "GameSpiller", "game_spiller",
+    "StockfishService", "EnginePool", "EnginePoolBusy", "engine_pool",
+    "PositionCache", "position_cache",
+    "MoveWriter", "move_writer",
+    "move_log",
+    "stream_moves_ndjson", "stream_games_pgn",
+    "PrincipalCache", "principal_cache",
+    "PasswordHasher", "PasswordPoolBusy", "password_hasher",
+    "TimerWheel", "timer_wheel"
 ]
@@ -1,17 +1,219 @@
+import asyncio
+import sys
+import time
 import chess
+import chess.polyglot
+from array import array
+from collections import OrderedDict
+from datetime import date
+from functools import lru_cache
+from itertools import groupby, islice
 from typing import Optional
 from dataclasses import dataclass, field
+from sqlalchemy import select
 
+from app.config import get_settings
+from app.database import AsyncSessionLocal, ReadSessionLocal
+from app.models import Game, GameMove
+from app.redis_client import get_redis
+from app.services.move_writer import move_writer
+from app.services.move_log import encode_move, decode_move
 
-@dataclass
+settings = get_settings()
+
+GAME_KEY = "chess:game:"
+
+# Append a move only if the stored ply count is the one the caller saw, and
+# charge the mover's clock (Redis TIME, so every worker agrees). Clocks start
+# after each side's first move (and again after a restore, which resets them). Returns {plies, white_ms, black_ms, turn_started_ms},
+# or {-1} on a version conflict, {-2} if the game is gone, {-3} if the mover flagged.
+APPEND_MOVE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {-2}
+end
+local ply = tonumber(ARGV[1])
+if redis.call('LLEN', KEYS[2]) ~= ply then
+    return {-1}
+end
+local clock = redis.call('HMGET', KEYS[1], 'base_ms', 'increment_ms', 'white_ms', 'black_ms', 'turn_started_ms')
+local white_ms, black_ms, now = 0, 0, 0
+if tonumber(clock[1] or '0') > 0 then
+    local t = redis.call('TIME')
+    now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+    white_ms, black_ms = tonumber(clock[3]), tonumber(clock[4])
+    if ply >= 2 and tonumber(clock[5]) > 0 then
+        local elapsed = now - tonumber(clock[5])
+        if ply % 2 == 0 then
+            white_ms = white_ms - elapsed
+            if white_ms <= 0 then
+                return {-3}
+            end
+            white_ms = white_ms + tonumber(clock[2])
+        else
+            black_ms = black_ms - elapsed
+            if black_ms <= 0 then
+                return {-3}
+            end
+            black_ms = black_ms + tonumber(clock[2])
+        end
+    end
+    redis.call('HSET', KEYS[1], 'white_ms', white_ms, 'black_ms', black_ms, 'turn_started_ms', now)
+end
+local plies = redis.call('RPUSH', KEYS[2], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return {plies, white_ms, black_ms, now}
+"""
+
+# Recreate a game from the database unless another worker already did.
+# Clocks are not persisted, so a restored game gets fresh ones.
+# ARGV: ttl, white_player_id, black_player_id, is_bot_game, base_ms, increment_ms, moves...
+RESTORE_GAME_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'white_player_id', ARGV[2], 'black_player_id', ARGV[3], 'is_bot_game', ARGV[4],
+    'base_ms', ARGV[5], 'increment_ms', ARGV[6], 'white_ms', ARGV[5], 'black_ms', ARGV[5], 'turn_started_ms', 0)
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('DEL', KEYS[2])
+for i = 7, #ARGV do
+    redis.call('RPUSH', KEYS[2], ARGV[i])
+end
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+RESULT_TAGS = {"white_wins": "1-0", "black_wins": "0-1", "draw": "1/2-1/2"}
+
+# Export-format PGN keeps movetext lines within 80 columns
+PGN_LINE_WIDTH = 80
+
+
+class Movetext:
+    """PGN movetext, wrapped as tokens are appended so rendering is a join"""
+    __slots__ = ("lines",)
+    
+    def __init__(self):
+        self.lines = []
+    
+    def append(self, token: str):
+        if self.lines and len(self.lines[-1]) + 1 + len(token) <= PGN_LINE_WIDTH:
+            self.lines[-1] = f"{self.lines[-1]} {token}"
+        else:
+            self.lines.append(token)
+
+
+def render_pgn(headers: dict, movetext: Movetext, result: Optional[str]) -> str:
+    """Tag pairs, a blank line, then the movetext ending in the result marker"""
+    result_tag = RESULT_TAGS.get(result, "*")
+    tags = "".join(f'[{name} "{value}"]\n' for name, value in {**headers, "Result": result_tag}.items())
+    lines = movetext.lines
+    if lines and len(lines[-1]) + 1 + len(result_tag) <= PGN_LINE_WIDTH:
+        body = "\n".join(lines[:-1] + [f"{lines[-1]} {result_tag}"])
+    else:
+        body = "\n".join(lines + [result_tag])
+    return f"{tags}\n{body}\n"
+
+
+def default_pgn_headers(game_id: int) -> dict:
+    return {
+        "Event": f"Game {game_id}",
+        "Site": settings.APP_NAME,
+        "Date": date.today().strftime("%Y.%m.%d"),
+        "Round": "-",
+        "White": "?",
+        "Black": "?",
+    }
+
+
+@dataclass(slots=True)
 class ChessGame:
-    """Manages the state of a chess game"""
+    """
+    Manages the state of a chess game.
+
+    Kept compact since every live game is resident: the board carries no move
+    stack (repetitions are counted by Zobrist key instead), and the move list
+    is 16-bit codes plus SAN strings rather than a dict with a FEN per ply.
+    """
     game_id: int
     white_player_id: int
     black_player_id: Optional[int]  # None for bot games
     is_bot_game: bool = False
     board: chess.Board = field(default_factory=chess.Board)
-    move_history: list = field(default_factory=list)
+    moves: array = field(default_factory=lambda: array("H"))  # move_log.encode_move codes
+    sans: list = field(default_factory=list)
+    pgn_headers: Optional[dict] = None
+    
+    # Clock (all 0 for untimed games); remaining times are as of turn_started_ms
+    base_ms: int = 0
+    increment_ms: int = 0
+    white_ms: int = 0
+    black_ms: int = 0
+    turn_started_ms: int = 0  # Epoch ms of the last committed move, 0 until the clock runs
+    
+    # Monotonic time of the last access on this worker, for idle spill-out
+    last_access: float = field(default_factory=time.monotonic, repr=False)
+    
+    # Movetext grows with each push, so get_pgn never replays the game
+    _movetext: Movetext = field(default_factory=Movetext, init=False, repr=False)
+    
+    # Zobrist key -> occurrences since the last irreversible move (fivefold repetition)
+    _repetitions: dict = field(default_factory=dict, init=False, repr=False)
+    
+    # Per-ply memoized state, computed on first use and reset on every push
+    _fen: Optional[str] = field(default=None, init=False, repr=False)
+    _legal: Optional[list] = field(default=None, init=False, repr=False)
+    _legal_set: Optional[frozenset] = field(default=None, init=False, repr=False)
+    _legal_uci: Optional[list] = field(default=None, init=False, repr=False)
+    _outcome: Optional[tuple] = field(default=None, init=False, repr=False)
+    
+    def __post_init__(self):
+        if self.pgn_headers is None:
+            self.pgn_headers = default_pgn_headers(self.game_id)
+        self._repetitions[chess.polyglot.zobrist_hash(self.board)] = 1
+    
+    @property
+    def ply(self) -> int:
+        return len(self.moves)
+    
+    def moves_uci(self) -> list[str]:
+        return [decode_move(code).uci() for code in self.moves]
+    
+    def last_move_uci(self) -> Optional[str]:
+        return decode_move(self.moves[-1]).uci() if self.moves else None
+    
+    def _push(self, move: chess.Move, move_san: str):
+        if self.board.turn == chess.WHITE:
+            self._movetext.append(f"{self.board.fullmove_number}. {move_san}")
+        else:
+            self._movetext.append(move_san)
+        self.board.push(move)
+        self.board.clear_stack()
+        self.moves.append(encode_move(move))
+        self.sans.append(move_san)
+        
+        # Earlier positions can't recur after a capture or pawn move
+        if self.board.halfmove_clock == 0:
+            self._repetitions.clear()
+        key = chess.polyglot.zobrist_hash(self.board)
+        self._repetitions[key] = self._repetitions.get(key, 0) + 1
+        
+        self._fen = None
+        self._legal = None
+        self._legal_set = None
+        self._legal_uci = None
+        self._outcome = None
+    
+    def _legal_moves(self) -> list[chess.Move]:
+        if self._legal is None:
+            self._legal = list(self.board.legal_moves)
+        return self._legal
+    
+    def _is_legal(self, move: chess.Move) -> bool:
+        if self._legal_set is None:
+            self._legal_set = frozenset(self._legal_moves())
+        return move in self._legal_set
     
     def make_move(self, move_uci: str) -> dict:
         """
@@ -21,7 +223,7 @@ class ChessGame:
         try:
             move = chess.Move.from_uci(move_uci)
             
-            if move not in self.board.legal_moves:
+            if not self._is_legal(move):
                 return {
                     "success": False,
                     "error": "Illegal move"
@@ -30,25 +232,18 @@ class ChessGame:
             # Get SAN before making move
             move_san = self.board.san(move)
             
-            # Make the move
-            self.board.push(move)
-            
-            # Record move
-            move_number = len(self.move_history) + 1
-            self.move_history.append({
-                "move_number": move_number,
-                "move_san": move_san,
-                "move_uci": move_uci,
-                "fen_after": self.board.fen()
-            })
+            # Make and record the move
+            self._push(move, move_san)
+            fen = self.get_fen()
             
+            result = self.get_result()
             return {
                 "success": True,
                 "move_san": move_san,
                 "move_uci": move_uci,
-                "fen": self.board.fen(),
-                "is_game_over": self.is_game_over(),
-                "result": self.get_result() if self.is_game_over() else None
+                "fen": fen,
+                "is_game_over": result is not None,
+                "result": result
             }
             
         except ValueError as e:
@@ -59,28 +254,24 @@ class ChessGame:
     
     def is_game_over(self) -> bool:
         """Check if the game is over"""
-        return self.board.is_game_over()
+        return self.get_result() is not None
     
     def get_result(self) -> Optional[str]:
         """Get the game result"""
-        if not self.is_game_over():
-            return None
-        
-        if self.board.is_checkmate():
-            # The side that just moved won
-            if self.board.turn == chess.WHITE:
-                return "black_wins"
+        if self._outcome is None:
+            # The board has no stack, so fivefold repetition is checked here
+            outcome = self.board.outcome()
+            if outcome is None:
+                result = "draw" if max(self._repetitions.values()) >= 5 else None
+            elif outcome.winner == chess.WHITE:
+                result = "white_wins"
+            elif outcome.winner == chess.BLACK:
+                result = "black_wins"
             else:
-                return "white_wins"
-        elif self.board.is_stalemate():
-            return "draw"
-        elif self.board.is_insufficient_material():
-            return "draw"
-        elif self.board.is_fifty_moves():
-            return "draw"
-        elif self.board.is_repetition():
-            return "draw"
-        return "draw"
+                # Stalemate, insufficient material or 75 moves
+                result = "draw"
+            self._outcome = (result,)
+        return self._outcome[0]
     
     def get_current_turn(self) -> str:
         """Get whose turn it is"""
@@ -88,53 +279,475 @@ class ChessGame:
     
     def get_legal_moves(self) -> list[str]:
         """Get all legal moves in UCI format"""
-        return [move.uci() for move in self.board.legal_moves]
+        if self._legal_uci is None:
+            self._legal_uci = [move.uci() for move in self._legal_moves()]
+        return self._legal_uci
     
     def get_fen(self) -> str:
         """Get current board position in FEN notation"""
-        return self.board.fen()
+        if self._fen is None:
+            self._fen = self.board.fen()
+        return self._fen
     
-    def get_pgn(self) -> str:
-        """Get game in PGN format"""
-        import chess.pgn
-        import io
-        
-        game = chess.pgn.Game()
-        node = game
-        
-        temp_board = chess.Board()
-        for move_data in self.move_history:
-            move = chess.Move.from_uci(move_data["move_uci"])
-            node = node.add_variation(move)
-            temp_board.push(move)
-        
-        exporter = io.StringIO()
-        exporter.write(str(game))
-        return exporter.getvalue()
+    def replay(self, moves_uci: list[str], moves_san: Optional[list[str]] = None):
+        """Apply already-validated moves (e.g. committed by another worker)"""
+        for i, move_uci in enumerate(moves_uci):
+            move = chess.Move.from_uci(move_uci)
+            move_san = moves_san[i] if moves_san else self.board.san(move)
+            self._push(move, move_san)
+    
+    def clock_deadline_ms(self) -> Optional[int]:
+        """Epoch ms at which the side to move flags, if its clock is running"""
+        if not self._clock_running():
+            return None
+        remaining = self.white_ms if self.board.turn == chess.WHITE else self.black_ms
+        return self.turn_started_ms + remaining
+    
+    def get_clock(self) -> Optional[dict]:
+        """Remaining times as of turn_started_ms (clients count down the side to move)"""
+        if not self.base_ms:
+            return None
+        return {
+            "white_ms": self.white_ms,
+            "black_ms": self.black_ms,
+            "turn_started_ms": self.turn_started_ms,
+            "running": self._clock_running()
+        }
+    
+    def _clock_running(self) -> bool:
+        return bool(self.base_ms and self.turn_started_ms) and self.ply >= 2
+    
+    def set_clock(self, white_ms, black_ms, turn_started_ms):
+        self.white_ms = int(white_ms)
+        self.black_ms = int(black_ms)
+        self.turn_started_ms = int(turn_started_ms)
+    
+    def get_pgn(self, result: Optional[str] = None, **tags) -> str:
+        """Get game in PGN format (result defaults to the board outcome)"""
+        return render_pgn({**self.pgn_headers, **tags}, self._movetext, result or self.get_result())
+
+
+# Active games live in Redis (players, plus the move list whose length is the
+# version); each worker keeps a local cache that it catches up on access.
+# Least recently used first, so the spiller can trim from the front.
+active_games: OrderedDict[int, ChessGame] = OrderedDict()
+_append_move_script = None
+_restore_game_script = None
+
+# game_id -> in-flight rehydration shared by concurrent callers
+_rehydrating: dict[int, asyncio.Task] = {}
+
+
+def _game_keys(game_id: int) -> tuple[str, str]:
+    return f"{GAME_KEY}{game_id}", f"{GAME_KEY}{game_id}:moves"
 
 
-# In-memory game storage (for active games)
-active_games: dict[int, ChessGame] = {}
+def _inactive_key(game_id: int) -> str:
+    """Marks a game known not to be active, so lookups skip the database for a while"""
+    return f"{GAME_KEY}{game_id}:inactive"
 
 
-def create_game(game_id: int, white_player_id: int, black_player_id: Optional[int], is_bot_game: bool = False) -> ChessGame:
-    """Create a new game and store it"""
+async def create_game(
+    game_id: int,
+    white_player_id: int,
+    black_player_id: Optional[int],
+    is_bot_game: bool = False,
+    base_seconds: Optional[int] = None,
+    increment_seconds: Optional[int] = None
+) -> ChessGame:
+    """Create a new game and store it (time control defaults to the configured one)"""
+    base_ms = 1000 * (settings.GAME_BASE_SECONDS if base_seconds is None else base_seconds)
+    increment_ms = 1000 * (settings.GAME_INCREMENT_SECONDS if increment_seconds is None else increment_seconds)
     game = ChessGame(
         game_id=game_id,
         white_player_id=white_player_id,
         black_player_id=black_player_id,
-        is_bot_game=is_bot_game
+        is_bot_game=is_bot_game,
+        base_ms=base_ms,
+        increment_ms=increment_ms,
+        white_ms=base_ms,
+        black_ms=base_ms
     )
+    redis_client = await get_redis()
+    meta_key, _ = _game_keys(game_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(_inactive_key(game_id))
+        pipe.hset(meta_key, mapping={
+            "white_player_id": white_player_id,
+            "black_player_id": black_player_id or "",
+            "is_bot_game": int(is_bot_game),
+            "base_ms": base_ms,
+            "increment_ms": increment_ms,
+            "white_ms": base_ms,
+            "black_ms": base_ms,
+            "turn_started_ms": 0,
+        })
+        pipe.expire(meta_key, settings.GAME_STATE_TTL_SECONDS)
+        await pipe.execute()
     active_games[game_id] = game
     return game
 
 
-def get_game(game_id: int) -> Optional[ChessGame]:
-    """Get an active game by ID"""
-    return active_games.get(game_id)
+async def get_game(game_id: int) -> Optional[ChessGame]:
+    """Get an active game by ID, catching up on moves made by other workers"""
+    redis_client = await get_redis()
+    meta_key, moves_key = _game_keys(game_id)
+    game = active_games.get(game_id)
+    
+    if game is None:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(meta_key)
+            pipe.lrange(moves_key, 0, -1)
+            pipe.exists(_inactive_key(game_id))
+            meta, moves, inactive = await pipe.execute()
+        if meta:
+            return _cache_game(game_id, meta, moves)
+        if inactive:
+            return None
+        return await _rehydrate(game_id)
+    
+    game.last_access = time.monotonic()
+    active_games.move_to_end(game_id)
+    start_ply = game.ply
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hmget(meta_key, "white_player_id", "white_ms", "black_ms", "turn_started_ms")
+        pipe.lrange(moves_key, start_ply, -1)
+        (exists, *clock), new_moves = await pipe.execute()
+    if not exists:
+        active_games.pop(game_id, None)
+        return None
+    # An overlapping get_game or a local move may have advanced the game meanwhile
+    new_moves = new_moves[game.ply - start_ply:]
+    if new_moves:
+        game.replay(new_moves)
+        if game.base_ms:
+            game.set_clock(*clock)
+    return game
+
+
+def _cache_game(game_id: int, meta: dict, moves: list[str]) -> ChessGame:
+    """Build a game from its Redis state and keep it on this worker"""
+    game = ChessGame(
+        game_id=game_id,
+        white_player_id=int(meta["white_player_id"]),
+        black_player_id=int(meta["black_player_id"]) if meta["black_player_id"] else None,
+        is_bot_game=meta["is_bot_game"] == "1",
+        base_ms=int(meta.get("base_ms") or 0),
+        increment_ms=int(meta.get("increment_ms") or 0)
+    )
+    game.set_clock(meta.get("white_ms") or 0, meta.get("black_ms") or 0, meta.get("turn_started_ms") or 0)
+    game.replay(moves)
+    active_games[game_id] = game
+    game_spiller.restored(game_id)
+    return game
+
+
+async def save_move(game: ChessGame, move_uci: str) -> bool:
+    """
+    Commit a move already applied to the local game.
+    Returns False (and drops the stale local copy) if another worker moved first.
+    """
+    global _append_move_script
+    redis_client = await get_redis()
+    if _append_move_script is None:
+        _append_move_script = redis_client.register_script(APPEND_MOVE_SCRIPT)
+    
+    plies, *clock = await _append_move_script(
+        keys=list(_game_keys(game.game_id)),
+        args=[game.ply - 1, move_uci, settings.GAME_STATE_TTL_SECONDS]
+    )
+    if plies < 0:
+        # Conflict, game gone or flagged: the local copy is ahead of the store
+        active_games.pop(game.game_id, None)
+        return False
+    if game.base_ms:
+        game.set_clock(*clock)
+    return True
+
+
+async def remove_game(game_id: int) -> bool:
+    """Remove a game from active games; True only for the caller that removed it"""
+    active_games.pop(game_id, None)
+    game_spiller.spilled.pop(game_id, None)
+    redis_client = await get_redis()
+    meta_key, moves_key = _game_keys(game_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(meta_key, moves_key)
+        pipe.set(_inactive_key(game_id), 1, ex=settings.GAME_INACTIVE_TTL_SECONDS)
+        deleted, _ = await pipe.execute()
+    return deleted > 0
+
+
+async def reinstate_game(game: ChessGame):
+    """Undo remove_game for a game whose settlement failed, clocks included"""
+    redis_client = await get_redis()
+    meta_key, _ = _game_keys(game.game_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(_inactive_key(game.game_id))
+        await _restore(redis_client, game, pipe)
+        pipe.hset(meta_key, mapping={
+            "white_ms": game.white_ms,
+            "black_ms": game.black_ms,
+            "turn_started_ms": game.turn_started_ms
+        })
+        await pipe.execute()
+    active_games[game.game_id] = game
+
+
+async def _restore(redis_client, game: ChessGame, pipe=None):
+    """Write a rebuilt game back to Redis (no-op if it is already there)"""
+    global _restore_game_script
+    if _restore_game_script is None:
+        _restore_game_script = redis_client.register_script(RESTORE_GAME_SCRIPT)
+    
+    args = [
+        settings.GAME_STATE_TTL_SECONDS,
+        game.white_player_id,
+        game.black_player_id or "",
+        int(game.is_bot_game),
+        game.base_ms,
+        game.increment_ms,
+        *game.moves_uci()
+    ]
+    return await _restore_game_script(keys=list(_game_keys(game.game_id)), args=args, client=pipe)
+
+
+def _build_game(game_id: int, white_player_id: int, black_player_id: Optional[int], is_bot_game: bool, moves: list) -> ChessGame:
+    """Rebuild a game from persisted (san, uci) rows without re-validating them"""
+    base_ms = settings.GAME_BASE_SECONDS * 1000
+    game = ChessGame(
+        game_id=game_id,
+        white_player_id=white_player_id,
+        black_player_id=black_player_id,
+        is_bot_game=is_bot_game,
+        base_ms=base_ms,
+        increment_ms=settings.GAME_INCREMENT_SECONDS * 1000,
+        white_ms=base_ms,
+        black_ms=base_ms
+    )
+    game.replay([m.move_uci for m in moves], [m.move_san for m in moves])
+    return game
+
+
+async def _rehydrate(game_id: int) -> Optional[ChessGame]:
+    """Rebuild a game missing from Redis from its persisted move log"""
+    task = _rehydrating.get(game_id)
+    if task is None:
+        task = asyncio.create_task(_load_from_db(game_id))
+        _rehydrating[game_id] = task
+        task.add_done_callback(lambda _: _rehydrating.pop(game_id, None))
+    return await asyncio.shield(task)
+
+
+async def _load_from_db(game_id: int) -> Optional[ChessGame]:
+    # Moves made on this worker may still be buffered
+    if move_writer.pending(game_id):
+        await move_writer.flush()
+    
+    redis_client = await get_redis()
+    async with ReadSessionLocal() as db:
+        result = await db.execute(
+            select(Game.white_player_id, Game.black_player_id, Game.is_bot_game)
+            .where(Game.id == game_id, Game.status == "active")
+        )
+        row = result.one_or_none()
+        if row is None:
+            # Finished or unknown: don't come back to the database for it for a while
+            await redis_client.set(_inactive_key(game_id), 1, ex=settings.GAME_INACTIVE_TTL_SECONDS)
+            return None
+        result = await db.execute(
+            select(GameMove.move_san, GameMove.move_uci)
+            .where(GameMove.game_id == game_id)
+            .order_by(GameMove.move_number)
+        )
+        moves = result.all()
+    
+    game = _build_game(game_id, row.white_player_id, row.black_player_id, row.is_bot_game, moves)
+    if not await _restore(redis_client, game):
+        # Another worker restored it first; use the shared copy (never rehydrate
+        # again from here: this task is the one callers are waiting on)
+        meta_key, moves_key = _game_keys(game_id)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(meta_key)
+            pipe.lrange(moves_key, 0, -1)
+            meta, moves = await pipe.execute()
+        return _cache_game(game_id, meta, moves) if meta else None
+    active_games[game_id] = game
+    return game
+
+
+async def warm_active_games(batch_size: int = 500) -> int:
+    """Restore every active game into Redis using one batched query"""
+    await move_writer.flush()
+    
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(
+                Game.id, Game.white_player_id, Game.black_player_id, Game.is_bot_game,
+                GameMove.move_san, GameMove.move_uci
+            )
+            .outerjoin(GameMove, GameMove.game_id == Game.id)
+            .where(Game.status == "active")
+            .order_by(Game.id, GameMove.move_number)
+        )
+        rows = result.all()
+    
+    redis_client = await get_redis()
+    restored = 0
+    pipe = redis_client.pipeline(transaction=False)
+    for game_id, game_rows in groupby(rows, key=lambda r: r.id):
+        game_rows = list(game_rows)
+        first = game_rows[0]
+        moves = [r for r in game_rows if r.move_uci is not None]
+        game = _build_game(game_id, first.white_player_id, first.black_player_id, first.is_bot_game, moves)
+        await _restore(redis_client, game, pipe)
+        restored += 1
+        if len(pipe) >= batch_size:
+            await pipe.execute()
+    if len(pipe):
+        await pipe.execute()
+    return restored
+
+
+def _deep_sizeof(obj, seen: set) -> int:
+    """Bytes held by obj and everything it owns (shared class-level objects excluded)"""
+    if id(obj) in seen or isinstance(obj, (type, type(sys))):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    elif not isinstance(obj, (str, bytes, int, float, bool, array)) and obj is not None:
+        if hasattr(obj, "__dict__"):
+            size += _deep_sizeof(vars(obj), seen)
+        for cls in type(obj).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if hasattr(obj, name):
+                    size += _deep_sizeof(getattr(obj, name), seen)
+    return size
+
+
+@lru_cache(maxsize=1)
+def game_size_model() -> tuple[int, int]:
+    """(bytes for a new game, bytes per ply), measured once on a sample game"""
+    game = ChessGame(game_id=0, white_player_id=0, black_player_id=None)
+    empty = _deep_sizeof(game, set())
+    plies = 0
+    while plies < 80 and not game.is_game_over():
+        # Deterministic sample line; per-ply cost hardly depends on the moves
+        game.make_move(game.get_legal_moves()[plies % len(game.get_legal_moves())])
+        plies += 1
+    game._fen = game._legal = game._legal_set = game._legal_uci = None
+    per_ply = (_deep_sizeof(game, set()) - empty) // max(plies, 1)
+    return empty, max(per_ply, 0)
+
+
+def estimated_game_bytes(game: ChessGame) -> int:
+    empty, per_ply = game_size_model()
+    return empty + per_ply * game.ply
+
+
+class GameSpiller:
+    """
+    Keeps this worker's active_games within a memory budget.
+
+    Every live game is already in Redis, so spilling is just dropping the
+    local copy; the next get_game rebuilds it transparently. Games idle for
+    idle_seconds are spilled first, then the least recently used ones until
+    the estimated footprint fits the budget.
+    
+    Only the most recent spills are remembered (for the restore ratio), so
+    the bookkeeping stays bounded however many games pass through a worker.
+    """
+    
+    MAX_TRACKED_SPILLS = 10_000
+    STATS_SAMPLE_GAMES = 16
+    
+    def __init__(self, budget_bytes: int, idle_seconds: float, interval: float):
+        self.budget_bytes = budget_bytes
+        self.idle_seconds = idle_seconds
+        self.interval = interval
+        self.spilled: OrderedDict[int, None] = OrderedDict()  # Recent spills not restored yet, oldest first
+        self.spills = 0
+        self.restores = 0
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Game spiller error: {e}")
+    
+    def sweep(self) -> int:
+        """Spill idle games, then LRU games while over budget; returns how many were spilled"""
+        cutoff = time.monotonic() - self.idle_seconds
+        idle = [game_id for game_id, game in active_games.items() if game.last_access < cutoff]
+        for game_id in idle:
+            self._spill(game_id)
+        
+        resident = sum(estimated_game_bytes(game) for game in active_games.values())
+        count = len(idle)
+        while resident > self.budget_bytes and active_games:
+            game_id, game = next(iter(active_games.items()))
+            resident -= estimated_game_bytes(game)
+            self._spill(game_id)
+            count += 1
+        return count
+    
+    def _spill(self, game_id: int):
+        active_games.pop(game_id, None)
+        self.spilled[game_id] = None
+        self.spilled.move_to_end(game_id)
+        if len(self.spilled) > self.MAX_TRACKED_SPILLS:
+            self.spilled.popitem(last=False)
+        self.spills += 1
+    
+    def restored(self, game_id: int):
+        if game_id in self.spilled:
+            del self.spilled[game_id]
+            self.restores += 1
+    
+    def stats(self) -> dict:
+        """
+        Resident footprint as estimates: the budget model extrapolates from one
+        synthetic game, and a few real resident games are measured to check it.
+        """
+        empty, per_ply = game_size_model()
+        estimated_bytes = sum(estimated_game_bytes(game) for game in active_games.values())
+        sample = list(islice(reversed(active_games.values()), self.STATS_SAMPLE_GAMES))
+        seen: set = set()
+        sampled_bytes = [_deep_sizeof(game, seen) for game in sample]
+        return {
+            "resident": len(active_games),
+            "spilled_recent": len(self.spilled),
+            "estimated_resident_bytes": estimated_bytes,
+            "budget_bytes": self.budget_bytes,
+            "estimated_bytes_per_game": estimated_bytes // len(active_games) if active_games else empty,
+            "model_bytes_new_game": empty,
+            "model_bytes_per_ply": per_ply,
+            "sampled_games": len(sample),
+            "sampled_bytes_per_game": sum(sampled_bytes) // len(sample) if sample else None,
+            "spills": self.spills,
+            "restores": self.restores
+        }
 
 
-def remove_game(game_id: int):
-    """Remove a game from active games"""
-    if game_id in active_games:
-        del active_games[game_id]
+game_spiller = GameSpiller(
+    budget_bytes=settings.GAME_MEMORY_BUDGET_MB * 1024 * 1024,
+    idle_seconds=settings.GAME_SPILL_IDLE_SECONDS,
+    interval=settings.GAME_SPILL_INTERVAL_SECONDS,
+)
@@ -0,0 +1,117 @@
+import json
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Optional
+
+import chess
+from sqlalchemy import select, or_
+from sqlalchemy.orm import aliased
+
+from app.config import get_settings
+from app.database import ReadSessionLocal
+from app.models import User, Game, GameMove, GameLog
+from app.services import move_log
+from app.services.chess_game import Movetext, render_pgn
+
+settings = get_settings()
+
+# Rows fetched per round trip from the server-side cursor, and lines per chunk sent
+STREAM_BATCH = 500
+
+
+def format_pgn(headers: dict, moves: Iterable[chess.Move], result: Optional[str]) -> str:
+    """Render one game as PGN from its moves (no chess.pgn tree is built)"""
+    board = chess.Board()
+    movetext = Movetext()
+    for move in moves:
+        san = board.san(move)
+        movetext.append(f"{board.fullmove_number}. {san}" if board.turn == chess.WHITE else san)
+        board.push(move)
+    return render_pgn(headers, movetext, result) + "\n"
+
+
+async def stream_moves_ndjson(game_id: int) -> AsyncIterator[bytes]:
+    """One JSON object per move, read with a server-side cursor"""
+    async with ReadSessionLocal() as db:
+        result = await db.execute(select(GameLog.moves).where(GameLog.game_id == game_id))
+        blob = result.scalar_one_or_none()
+        if blob is not None:
+            rows = move_log.iter_moves(blob)
+            async for chunk in _ndjson_chunks(_aiter(rows)):
+                yield chunk
+            return
+
+        result = await db.stream(
+            select(GameMove.move_number, GameMove.move_san, GameMove.move_uci, GameMove.fen_after)
+            .where(GameMove.game_id == game_id)
+            .order_by(GameMove.move_number)
+            .execution_options(yield_per=STREAM_BATCH)
+        )
+        rows = (row._asdict() async for row in result)
+        async for chunk in _ndjson_chunks(rows):
+            yield chunk
+
+
+async def stream_games_pgn(
+    user_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> AsyncIterator[bytes]:
+    """A player's games as a multi-game PGN, oldest first"""
+    white = aliased(User)
+    black = aliased(User)
+    query = (
+        select(
+            Game.id, Game.result, Game.is_bot_game, Game.created_at,
+            white.username.label("white"), black.username.label("black"),
+            GameLog.moves,
+        )
+        .join(white, white.id == Game.white_player_id)
+        .outerjoin(black, black.id == Game.black_player_id)
+        .outerjoin(GameLog, GameLog.game_id == Game.id)
+        .where(or_(Game.white_player_id == user_id, Game.black_player_id == user_id))
+        .order_by(Game.id)
+    )
+    if since is not None:
+        query = query.where(Game.created_at >= since)
+    if until is not None:
+        query = query.where(Game.created_at < until)
+
+    # Games without a compact log (still in progress) read their rows on a second connection
+    async with ReadSessionLocal() as db, ReadSessionLocal() as moves_db:
+        result = await db.stream(query.execution_options(yield_per=STREAM_BATCH))
+        async for row in result:
+            if row.moves is not None:
+                moves = move_log.unpack_moves(row.moves)
+            else:
+                uci = await moves_db.execute(
+                    select(GameMove.move_uci)
+                    .where(GameMove.game_id == row.id)
+                    .order_by(GameMove.move_number)
+                )
+                moves = [chess.Move.from_uci(m) for m in uci.scalars()]
+
+            headers = {
+                "Event": f"Game {row.id}",
+                "Site": settings.APP_NAME,
+                "Date": row.created_at.strftime("%Y.%m.%d") if row.created_at else "????.??.??",
+                "Round": "-",
+                "White": row.white,
+                "Black": "Stockfish" if row.is_bot_game else (row.black or "?"),
+            }
+            yield format_pgn(headers, moves, row.result).encode()
+
+
+async def _aiter(rows: Iterable[dict]) -> AsyncIterator[dict]:
+    for row in rows:
+        yield row
+
+
+async def _ndjson_chunks(rows: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    lines = []
+    async for row in rows:
+        lines.append(json.dumps(row))
+        if len(lines) >= STREAM_BATCH:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
@@ -1,3 +1,5 @@
+import json
+import time
 import redis.asyncio as redis
 from app.config import get_settings
 
@@ -5,25 +7,65 @@ settings = get_settings()
 
 LEADERBOARD_KEY = "chess:leaderboard"
 
+# One page of the board plus its size, read atomically.
+# ARGV: start rank (0-based), page size. Returns {total, member, score, ...}
+PAGE_SCRIPT = """
+local total = redis.call('ZCARD', KEYS[1])
+local start = tonumber(ARGV[1])
+local entries = redis.call('ZREVRANGE', KEYS[1], start, start + tonumber(ARGV[2]) - 1, 'WITHSCORES')
+table.insert(entries, 1, total)
+return entries
+"""
+
+# The players ranked within ARGV[2] places of member ARGV[1].
+# Returns {total, start rank, member, score, ...} or nil if the member is unranked.
+AROUND_SCRIPT = """
+local rank = redis.call('ZREVRANK', KEYS[1], ARGV[1])
+if not rank then
+    return nil
+end
+local radius = tonumber(ARGV[2])
+local start = math.max(0, rank - radius)
+local entries = redis.call('ZREVRANGE', KEYS[1], start, rank + radius, 'WITHSCORES')
+table.insert(entries, 1, start)
+table.insert(entries, 1, redis.call('ZCARD', KEYS[1]))
+return entries
+"""
+
+_page_script = None
+_around_script = None
+
+# limit -> (expires_at, lowest points in the snapshot, serialized response)
+_snapshot_cache: dict[int, tuple[float, float, bytes]] = {}
+MAX_CACHED_SNAPSHOTS = 64
+
+
+def _invalidate_snapshots(old_points: float, new_points: float):
+    """Drop cached snapshots whose top-N a score change could affect"""
+    affected = max(old_points, new_points)
+    for limit, (_, min_points, _) in list(_snapshot_cache.items()):
+        if affected >= min_points:
+            del _snapshot_cache[limit]
+
 
 async def add_to_leaderboard(redis_client: redis.Redis, user_id: int, username: str, points: int):
     """Add or update user in leaderboard"""
     # Use sorted set with score = points, member = "user_id:username"
     member = f"{user_id}:{username}"
     await redis_client.zadd(LEADERBOARD_KEY, {member: points})
+    _invalidate_snapshots(points, points)
 
 
 async def update_points(redis_client: redis.Redis, user_id: int, username: str, points_delta: int):
     """Update user's points in leaderboard"""
     member = f"{user_id}:{username}"
-    await redis_client.zincrby(LEADERBOARD_KEY, points_delta, member)
+    new_points = await redis_client.zincrby(LEADERBOARD_KEY, points_delta, member)
+    _invalidate_snapshots(new_points - points_delta, new_points)
 
 
-async def get_top_players(redis_client: redis.Redis, limit: int = 10) -> list[dict]:
-    """Get top N players from leaderboard"""
-    results = await redis_client.zrevrange(LEADERBOARD_KEY, 0, limit - 1, withscores=True)
+def _parse_entries(results: list, start_rank: int = 1) -> list[dict]:
     leaderboard = []
-    for rank, (member, score) in enumerate(results, start=1):
+    for rank, (member, score) in enumerate(results, start=start_rank):
         user_id, username = member.split(":", 1)
         leaderboard.append({
             "rank": rank,
@@ -34,13 +76,63 @@ async def get_top_players(redis_client: redis.Redis, limit: int = 10) -> list[di
     return leaderboard
 
 
+async def update_points_many(redis_client: redis.Redis, updates: list[tuple[int, str, int]]):
+    """Apply several (user_id, username, points_delta) updates in one pipeline"""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for user_id, username, points_delta in updates:
+            pipe.zincrby(LEADERBOARD_KEY, points_delta, f"{user_id}:{username}")
+        results = await pipe.execute()
+    for (_, _, points_delta), new_points in zip(updates, results):
+        _invalidate_snapshots(new_points - points_delta, new_points)
+
+
+async def get_top_players(redis_client: redis.Redis, limit: int = 10) -> list[dict]:
+    """Get top N players from leaderboard"""
+    results = await redis_client.zrevrange(LEADERBOARD_KEY, 0, limit - 1, withscores=True)
+    return _parse_entries(results)
+
+
+async def get_leaderboard_json(redis_client: redis.Redis, limit: int = 10) -> bytes:
+    """
+    Serialized top-N leaderboard response.
+    Served from a short-lived in-process snapshot; a miss costs one pipelined round trip.
+    """
+    now = time.monotonic()
+    cached = _snapshot_cache.get(limit)
+    if cached and cached[0] > now:
+        return cached[2]
+    
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zrevrange(LEADERBOARD_KEY, 0, limit - 1, withscores=True)
+        pipe.zcard(LEADERBOARD_KEY)
+        results, total = await pipe.execute()
+    
+    entries = _parse_entries(results)
+    payload = json.dumps({
+        "entries": [
+            {"rank": e["rank"], "username": e["username"], "points": e["points"]}
+            for e in entries
+        ],
+        "total_players": total
+    }).encode()
+    
+    # A short board changes whenever anyone scores; a full one only at its boundary
+    min_points = entries[-1]["points"] if len(entries) == limit else float("-inf")
+    if len(_snapshot_cache) >= MAX_CACHED_SNAPSHOTS:
+        _snapshot_cache.clear()
+    _snapshot_cache[limit] = (now + settings.LEADERBOARD_CACHE_TTL_SECONDS, min_points, payload)
+    return payload
+
+
 async def get_player_rank(redis_client: redis.Redis, user_id: int, username: str) -> dict | None:
     """Get a specific player's rank"""
     member = f"{user_id}:{username}"
-    rank = await redis_client.zrevrank(LEADERBOARD_KEY, member)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zrevrank(LEADERBOARD_KEY, member)
+        pipe.zscore(LEADERBOARD_KEY, member)
+        rank, score = await pipe.execute()
     if rank is None:
         return None
-    score = await redis_client.zscore(LEADERBOARD_KEY, member)
     return {
         "rank": rank + 1,  # Convert 0-indexed to 1-indexed
         "user_id": user_id,
@@ -52,3 +144,40 @@ async def get_player_rank(redis_client: redis.Redis, user_id: int, username: str
 async def get_total_players(redis_client: redis.Redis) -> int:
     """Get total number of players in leaderboard"""
     return await redis_client.zcard(LEADERBOARD_KEY)
+
+
+def _pairs(flat: list) -> list[tuple[str, float]]:
+    return [(flat[i], float(flat[i + 1])) for i in range(0, len(flat), 2)]
+
+
+async def get_leaderboard_page(redis_client: redis.Redis, start: int, count: int) -> dict:
+    """Get `count` players starting at 0-based rank `start`, with the cursor for the next page"""
+    global _page_script
+    if _page_script is None:
+        _page_script = redis_client.register_script(PAGE_SCRIPT)
+    
+    result = await _page_script(keys=[LEADERBOARD_KEY], args=[start, count])
+    total = result[0]
+    entries = _parse_entries(_pairs(result[1:]), start_rank=start + 1)
+    next_start = start + len(entries)
+    return {
+        "entries": entries,
+        "total_players": total,
+        "next_cursor": next_start if next_start < total and entries else None
+    }
+
+
+async def get_players_around(redis_client: redis.Redis, user_id: int, username: str, radius: int) -> dict | None:
+    """Get the players ranked up to `radius` places above and below a player"""
+    global _around_script
+    if _around_script is None:
+        _around_script = redis_client.register_script(AROUND_SCRIPT)
+    
+    member = f"{user_id}:{username}"
+    result = await _around_script(keys=[LEADERBOARD_KEY], args=[member, radius])
+    if result is None:
+        return None
+    total, start = result[0], result[1]
+    entries = _parse_entries(_pairs(result[2:]), start_rank=start + 1)
+    rank = next(e["rank"] for e in entries if e["user_id"] == user_id)
+    return {"entries": entries, "total_players": total, "rank": rank}
@@ -1,4 +1,6 @@
 import asyncio
+import json
+import time
 import uuid
 import redis.asyncio as redis
 from typing import Optional
@@ -6,113 +8,335 @@ from app.config import get_settings
 
 settings = get_settings()
 
-MATCHMAKING_QUEUE = "chess:matchmaking:queue"
-MATCHMAKING_RESULTS = "chess:matchmaking:results:"
+MATCHMAKING_POOL = "chess:matchmaking:pool"  # ZSET entry_id -> points
+MATCHMAKING_WAITING = "chess:matchmaking:waiting"  # ZSET entry_id -> enqueue time
+MATCHMAKING_ENTRY = "chess:matchmaking:entry:"  # HASH user_id, username
+MATCHMAKING_RESULTS = "chess:matchmaking:results:"  # Pairing/game events kept for waiters that miss the publish
+MATCHMAKING_RESULT_TTL = 30
+MATCHMAKING_EVENTS = "chess:matchmaking:events"
+
+# Pair the oldest waiting entries with the closest-rated opponent inside a
+# points window that widens with wait time. Every step is a bounded sorted
+# set lookup, so a sweep costs O(batch * log n) regardless of queue size.
+# Returns a flat list of {white_entry, black_entry, black_user_id, black_username}.
+PAIR_SCRIPT = """
+local pool, waiting, prefix = KEYS[1], KEYS[2], ARGV[1]
+local now = tonumber(ARGV[2])
+local base, growth, max_window = tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+local batch, candidates = tonumber(ARGV[6]), tonumber(ARGV[7])
+
+local function forget(entry)
+    redis.call('ZREM', pool, entry)
+    redis.call('ZREM', waiting, entry)
+    redis.call('DEL', prefix .. entry)
+end
+
+local out = {}
+local oldest = redis.call('ZRANGE', waiting, 0, batch - 1, 'WITHSCORES')
+for i = 1, #oldest, 2 do
+    local entry = oldest[i]
+    local points = redis.call('ZSCORE', pool, entry)
+    local user = redis.call('HGET', prefix .. entry, 'user_id')
+    if not points or not user then
+        -- Already paired, or its hash expired (e.g. left behind by a dead node)
+        forget(entry)
+    else
+        points = tonumber(points)
+        local window = math.min(base + growth * (now - tonumber(oldest[i + 1])), max_window)
+        local best, best_distance = nil, nil
+        local ranges = {
+            redis.call('ZRANGEBYSCORE', pool, points, points + window, 'WITHSCORES', 'LIMIT', 0, candidates),
+            redis.call('ZREVRANGEBYSCORE', pool, points, points - window, 'WITHSCORES', 'LIMIT', 0, candidates),
+        }
+        for _, range in ipairs(ranges) do
+            for j = 1, #range, 2 do
+                local other = range[j]
+                local distance = math.abs(tonumber(range[j + 1]) - points)
+                if other ~= entry and (best == nil or distance < best_distance) then
+                    local other_user = redis.call('HGET', prefix .. other, 'user_id')
+                    if not other_user then
+                        forget(other)
+                    elseif other_user ~= user then
+                        best, best_distance = other, distance
+                    end
+                end
+            end
+        end
+        if best then
+            local other = redis.call('HMGET', prefix .. best, 'user_id', 'username')
+            forget(entry)
+            forget(best)
+            table.insert(out, entry)
+            table.insert(out, best)
+            table.insert(out, other[1])
+            table.insert(out, other[2] or '')
+        end
+    end
+end
+return out
+"""
+
+# Remove an entry if it is still queued; returns 1 if it was.
+CANCEL_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 1 then
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    redis.call('DEL', KEYS[3])
+    return 1
+end
+return 0
+"""
+
+
+class MatchmakingEngine:
+    """
+    Per-node matcher.
+
+    A single background task pairs queued players with an atomic script and
+    publishes the pairing; every node listens on the events channel and wakes
+    its local waiters through asyncio futures. Waiting requests never poll Redis.
+    """
+
+    def __init__(self):
+        self.redis: Optional[redis.Redis] = None
+        self._waiters: dict[str, asyncio.Future] = {}
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._pair_script = None
+        self._cancel_script = None
+
+    async def start(self, redis_client: redis.Redis):
+        """Start the matcher and event listener tasks"""
+        if self._tasks:
+            return
+        self.redis = redis_client
+        self._pair_script = redis_client.register_script(PAIR_SCRIPT)
+        self._cancel_script = redis_client.register_script(CANCEL_SCRIPT)
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._match_loop()),
+        ]
+
+    async def stop(self):
+        """Cancel background tasks and release any waiting requests"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for future in self._waiters.values():
+            if not future.done():
+                future.cancel()
+        self._waiters.clear()
+
+    def register(self, entry_id: str) -> asyncio.Future:
+        """Create a future that resolves when the entry is matched"""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[entry_id] = future
+        return future
+
+    def unregister(self, entry_id: str):
+        self._waiters.pop(entry_id, None)
+
+    async def publish(self, event: dict):
+        await self.redis.publish(MATCHMAKING_EVENTS, json.dumps(event))
+
+    async def cancel(self, entry_id: str) -> bool:
+        """Remove an entry from the queue; False if it was already matched"""
+        keys = [MATCHMAKING_POOL, MATCHMAKING_WAITING, f"{MATCHMAKING_ENTRY}{entry_id}"]
+        return await self._cancel_script(keys=keys, args=[entry_id]) == 1
+
+    async def _listen(self):
+        """Resolve local waiters from match events published by any node"""
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(MATCHMAKING_EVENTS)
+                # Pairings published while we were unsubscribed are only in the results keys
+                await self._recover_waiters()
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None:
+                        continue
+                    event = json.loads(message["data"])
+                    if event["type"] == "enqueued":
+                        self._wakeup.set()
+                        continue
+                    future = self._waiters.get(event["entry_id"])
+                    if future and not future.done():
+                        future.set_result(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Matchmaking listener error: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def _recover_waiters(self):
+        """Resolve local waiters from stored results, e.g. after the listener reconnects"""
+        entry_ids = [entry_id for entry_id, future in self._waiters.items() if not future.done()]
+        if not entry_ids:
+            return
+        results = await self.redis.mget([f"{MATCHMAKING_RESULTS}{entry_id}" for entry_id in entry_ids])
+        for entry_id, result in zip(entry_ids, results):
+            future = self._waiters.get(entry_id)
+            if result and future and not future.done():
+                future.set_result(json.loads(result))
+
+    async def _match_loop(self):
+        """Sweep the queue on every enqueue and on a fixed tick as windows widen"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.MATCHMAKING_TICK_SECONDS)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while await self._pair_once():
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Matchmaking error: {e}")
+
+    async def _pair_once(self) -> bool:
+        """Run one sweep; True if any pairs were made"""
+        pairs = await self._pair_script(
+            keys=[MATCHMAKING_POOL, MATCHMAKING_WAITING],
+            args=[
+                MATCHMAKING_ENTRY,
+                time.time(),
+                settings.MATCHMAKING_WINDOW_BASE,
+                settings.MATCHMAKING_WINDOW_GROWTH,
+                settings.MATCHMAKING_WINDOW_MAX,
+                settings.MATCHMAKING_SWEEP_BATCH,
+                settings.MATCHMAKING_CANDIDATES,
+            ],
+        )
+        if not pairs:
+            return False
+
+        # The longest-waiting player is white and creates the game
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for i in range(0, len(pairs), 4):
+                white_entry_id, black_entry_id, black_user_id, black_username = pairs[i:i + 4]
+                event = json.dumps({
+                    "type": "matched",
+                    "entry_id": white_entry_id,
+                    "opponent_id": int(black_user_id),
+                    "opponent_username": black_username,
+                    "other_entry_id": black_entry_id,
+                })
+                pipe.setex(f"{MATCHMAKING_RESULTS}{white_entry_id}", MATCHMAKING_RESULT_TTL, event)
+                pipe.publish(MATCHMAKING_EVENTS, event)
+            await pipe.execute()
+        return True
+
+
+matchmaking_engine = MatchmakingEngine()
 
 
 class MatchmakingService:
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, engine: MatchmakingEngine = matchmaking_engine):
         self.redis = redis_client
+        self.engine = engine
         self.timeout = settings.MATCHMAKING_TIMEOUT_SECONDS
-    
-    async def join_queue(self, user_id: int, username: str) -> str:
+
+    async def join_queue(self, user_id: int, username: str, points: int = 0, entry_id: Optional[str] = None) -> str:
         """Add player to matchmaking queue and return their queue entry ID"""
-        entry_id = str(uuid.uuid4())
-        entry = f"{user_id}:{username}:{entry_id}"
-        
-        # Add to queue
-        await self.redis.lpush(MATCHMAKING_QUEUE, entry)
-        
+        entry_id = entry_id or str(uuid.uuid4())
+        entry_key = f"{MATCHMAKING_ENTRY}{entry_id}"
+        # Outlive the request so the matcher can still read a just-paired entry
+        ttl = int(self.timeout + settings.MATCHMAKING_GRACE_SECONDS) + 60
+
+        # Index by points and join time, then wake up the matchers
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(entry_key, mapping={"user_id": user_id, "username": username})
+            pipe.expire(entry_key, ttl)
+            pipe.zadd(MATCHMAKING_POOL, {entry_id: points})
+            pipe.zadd(MATCHMAKING_WAITING, {entry_id: time.time()})
+            pipe.publish(MATCHMAKING_EVENTS, json.dumps({"type": "enqueued"}))
+            await pipe.execute()
+
         return entry_id
-    
-    async def find_match(self, user_id: int, username: str) -> dict:
+
+    async def find_match(self, user_id: int, username: str, points: int = 0) -> dict:
         """
         Try to find a match for the player.
         Returns match result after timeout or when match is found.
         """
-        entry_id = await self.join_queue(user_id, username)
-        result_key = f"{MATCHMAKING_RESULTS}{entry_id}"
-        
-        # Wait for match result (check every 500ms)
-        elapsed = 0
-        check_interval = 0.5
-        
-        while elapsed < self.timeout:
-            # Check if matched by another player
-            result = await self.redis.get(result_key)
-            if result:
-                await self.redis.delete(result_key)
-                parts = result.split(":")
-                return {
-                    "status": "matched",
-                    "game_id": int(parts[0]),
-                    "opponent_id": int(parts[1]),
-                    "opponent_username": parts[2],
-                    "color": parts[3]
-                }
-            
-            # Try to match with someone else in queue
-            match_result = await self._try_match(user_id, username, entry_id)
-            if match_result:
-                return match_result
-            
-            await asyncio.sleep(check_interval)
-            elapsed += check_interval
-        
-        # Timeout - remove from queue and return bot game
-        await self._remove_from_queue(user_id, username, entry_id)
-        return {
-            "status": "bot_game",
-            "game_id": None,  # Will be created by caller
-            "opponent_id": None,
-            "opponent_username": "Stockfish",
-            "color": "white"
-        }
-    
-    async def _try_match(self, user_id: int, username: str, entry_id: str) -> Optional[dict]:
-        """Try to find and match with another player in queue using atomic operations"""
-        
-        # Use atomic RPOP to get one entry from queue
-        # This prevents race conditions where both players try to match simultaneously
-        while True:
-            entry = await self.redis.rpop(MATCHMAKING_QUEUE)
-            if not entry:
-                # Queue is empty, re-add ourselves
-                return None
-            
-            other_user_id, other_username, other_entry_id = entry.split(":")
-            other_user_id = int(other_user_id)
-            
-            # Don't match with self - put it back and continue
-            if other_user_id == user_id:
-                # Put our entry back at the end
-                await self.redis.rpush(MATCHMAKING_QUEUE, entry)
-                return None
-            
-            # Remove ourselves from queue as well
-            await self._remove_from_queue(user_id, username, entry_id)
-            
-            # Found a match! (this player is white, other is black)
+        entry_id = str(uuid.uuid4())
+        future = self.engine.register(entry_id)
+        try:
+            await self.join_queue(user_id, username, points, entry_id)
+
+            try:
+                event = await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+            except TimeoutError:
+                event = await self._on_timeout(entry_id, future)
+        finally:
+            self.engine.unregister(entry_id)
+
+        if event is None:
             return {
-                "status": "matched",
+                "status": "bot_game",
                 "game_id": None,  # Will be created by caller
-                "opponent_id": other_user_id,
-                "opponent_username": other_username,
+                "opponent_id": None,
+                "opponent_username": "Stockfish",
+                "color": "white"
+            }
+
+        if event["type"] == "matched":
+            # This player is white and creates the game
+            return {
+                "status": "matched",
+                "game_id": None,
+                "opponent_id": event["opponent_id"],
+                "opponent_username": event["opponent_username"],
                 "color": "white",
-                "other_entry_id": other_entry_id
+                "other_entry_id": event["other_entry_id"]
             }
-    
+
+        return {
+            "status": "matched",
+            "game_id": event["game_id"],
+            "opponent_id": event["opponent_id"],
+            "opponent_username": event["opponent_username"],
+            "color": event["color"]
+        }
+
+    async def _on_timeout(self, entry_id: str, future: asyncio.Future) -> Optional[dict]:
+        """Leave the queue, or finish the match if the matcher already took us"""
+        if await self.engine.cancel(entry_id):
+            return None
+
+        # Already paired: wait briefly for the game, then fall back to the stored result
+        try:
+            return await asyncio.wait_for(future, timeout=settings.MATCHMAKING_GRACE_SECONDS)
+        except TimeoutError:
+            pass
+
+        result_key = f"{MATCHMAKING_RESULTS}{entry_id}"
+        result = await self.redis.getdel(result_key)
+        if result:
+            return json.loads(result)
+        return None
+
     async def notify_opponent(self, other_entry_id: str, game_id: int, user_id: int, username: str):
         """Notify the matched opponent about the game"""
+        event = {
+            "type": "game",
+            "entry_id": other_entry_id,
+            "game_id": game_id,
+            "opponent_id": user_id,
+            "opponent_username": username,
+            "color": "black"
+        }
         result_key = f"{MATCHMAKING_RESULTS}{other_entry_id}"
-        result = f"{game_id}:{user_id}:{username}:black"
-        await self.redis.setex(result_key, 30, result)  # Expire after 30 seconds
-    
-    async def _remove_from_queue(self, user_id: int, username: str, entry_id: str):
-        """Remove a player from the matchmaking queue"""
-        entry = f"{user_id}:{username}:{entry_id}"
-        await self.redis.lrem(MATCHMAKING_QUEUE, 0, entry)
-    
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.setex(result_key, MATCHMAKING_RESULT_TTL, json.dumps(event))
+            pipe.publish(MATCHMAKING_EVENTS, json.dumps(event))
+            await pipe.execute()
+
     async def get_queue_size(self) -> int:
         """Get current queue size"""
-        return await self.redis.llen(MATCHMAKING_QUEUE)
+        return await self.redis.zcard(MATCHMAKING_POOL)
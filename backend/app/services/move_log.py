@@ -0,0 +1,79 @@
+import struct
+from typing import Iterator, Optional
+
+import chess
+
+# Compact move log for finished games: each move is packed into 16 bits
+# (from-square 6, to-square 6, promotion 3) and a FEN keyframe is kept every
+# KEYFRAME_INTERVAL plies, so any ply is at most KEYFRAME_INTERVAL - 1 pushes away.
+# Part of the stored format (logs don't record it): never change it.
+KEYFRAME_INTERVAL = 16
+
+# Index 0 means "no promotion"
+PROMOTIONS = [None, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]
+
+
+def encode_move(move: chess.Move) -> int:
+    """Pack a move into 16 bits"""
+    return move.from_square | (move.to_square << 6) | (PROMOTIONS.index(move.promotion) << 12)
+
+
+def decode_move(code: int) -> chess.Move:
+    """Unpack a 16-bit move"""
+    return chess.Move(code & 0x3F, (code >> 6) & 0x3F, PROMOTIONS[(code >> 12) & 0x7])
+
+
+def pack_moves(moves_uci: list[str]) -> bytes:
+    """Encode a list of UCI moves as a little-endian blob"""
+    codes = [encode_move(chess.Move.from_uci(uci)) for uci in moves_uci]
+    return struct.pack(f"<{len(codes)}H", *codes)
+
+
+def unpack_moves(blob: bytes, start: int = 0, stop: Optional[int] = None) -> list[chess.Move]:
+    """Decode plies [start, stop) from a blob"""
+    count = len(blob) // 2
+    stop = count if stop is None else min(stop, count)
+    if start >= stop:
+        return []
+    codes = struct.unpack_from(f"<{stop - start}H", blob, start * 2)
+    return [decode_move(code) for code in codes]
+
+
+def build_keyframes(moves_uci: list[str]) -> str:
+    """FEN after every KEYFRAME_INTERVAL plies (starting with ply 0), newline separated"""
+    board = chess.Board()
+    keyframes = [board.fen()]
+    for ply, uci in enumerate(moves_uci, start=1):
+        board.push(chess.Move.from_uci(uci))
+        if ply % KEYFRAME_INTERVAL == 0:
+            keyframes.append(board.fen())
+    return "\n".join(keyframes)
+
+
+def ply_count(blob: bytes) -> int:
+    return len(blob) // 2
+
+
+def fen_at(blob: bytes, keyframes: str, ply: int) -> str:
+    """Board position after `ply` moves, seeking from the nearest keyframe"""
+    frames = keyframes.split("\n")
+    ply = max(0, min(ply, ply_count(blob)))
+    index = min(ply // KEYFRAME_INTERVAL, len(frames) - 1)
+    board = chess.Board(frames[index])
+    for move in unpack_moves(blob, index * KEYFRAME_INTERVAL, ply):
+        board.push(move)
+    return board.fen()
+
+
+def iter_moves(blob: bytes) -> Iterator[dict]:
+    """Replay the log, yielding the same fields as a GameMove row"""
+    board = chess.Board()
+    for move_number, move in enumerate(unpack_moves(blob), start=1):
+        move_san = board.san(move)
+        board.push(move)
+        yield {
+            "move_number": move_number,
+            "move_san": move_san,
+            "move_uci": move.uci(),
+            "fen_after": board.fen()
+        }
@@ -0,0 +1,169 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from sqlalchemy import insert, delete, select
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models import GameMove, GameLog
+
+settings = get_settings()
+
+
+class MoveWriter:
+    """
+    Write-behind buffer for GameMove rows.
+
+    Moves from all games are buffered and written with one bulk INSERT per
+    flush, triggered by batch size or interval, and forced on shutdown.
+
+    A batch rejected because of its data is retried row by row so a bad row
+    is dropped on its own; any other failure (database unavailable) keeps the
+    rows for the next flush, up to max_buffer rows, oldest dropped first.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_buffer: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: list[dict] = []
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.flushes = 0
+        self.rows_written = 0
+        self.failures = 0
+        self.rejected = 0  # Rows the database refused
+        self.dropped = 0  # Rows lost to the buffer cap
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def add(self, game_id: int, move_number: int, move_san: str, move_uci: str, fen_after: str):
+        """Buffer a move for the next flush"""
+        self._buffer.append({
+            "game_id": game_id,
+            "move_number": move_number,
+            "move_san": move_san,
+            "move_uci": move_uci,
+            "fen_after": fen_after,
+            "timestamp": datetime.now(timezone.utc),
+        })
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        self._trim()
+
+    def discard(self, game_id: int) -> int:
+        """Drop a game's buffered moves (superseded by its settled move log)"""
+        kept = [row for row in self._buffer if row["game_id"] != game_id]
+        discarded = len(self._buffer) - len(kept)
+        self._buffer = kept
+        return discarded
+
+    def pending(self, game_id: int) -> bool:
+        return any(row["game_id"] == game_id for row in self._buffer)
+
+    def _trim(self):
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write out anything still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> bool:
+        """Write all buffered moves; False if some are still buffered after a failure"""
+        async with self._lock:
+            if not self._buffer:
+                return True
+            rows, self._buffer = self._buffer, []
+
+            game_ids = {row["game_id"] for row in rows}
+            start = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    try:
+                        await db.execute(insert(GameMove), rows)
+                        written = len(rows)
+                    except (IntegrityError, DataError):
+                        await db.rollback()
+                        written = await self._write_each(db, rows)
+                        rows.clear()  # Committed row by row
+                    # Moves of games settled meanwhile (e.g. by another worker) are
+                    # superseded by their move log; don't leave them behind
+                    await db.execute(
+                        delete(GameMove)
+                        .where(GameMove.game_id.in_(select(GameLog.game_id).where(GameLog.game_id.in_(game_ids))))
+                        .execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+            except Exception as e:
+                # Keep the rows (in order) for the next attempt
+                self.failures += 1
+                self._buffer[:0] = rows
+                self._trim()
+                print(f"Move flush failed ({len(self._buffer)} moves buffered, {self.dropped} dropped): {e}")
+                return False
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.flushes += 1
+            self.rows_written += written
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            return True
+
+    async def _write_each(self, db, rows: list[dict]) -> int:
+        """Insert rows one at a time, dropping the ones the database rejects"""
+        written = 0
+        for i, row in enumerate(rows):
+            try:
+                await db.execute(insert(GameMove), [row])
+                await db.commit()
+                written += 1
+            except (IntegrityError, DataError) as e:
+                await db.rollback()
+                print(f"Dropping move {row['move_number']} of game {row['game_id']}: {e}")
+                self.rejected += 1
+            except Exception:
+                # Not the row's fault: leave the unwritten rows for the caller to keep
+                del rows[:i]
+                raise
+        return written
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": len(self._buffer),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+
+move_writer = MoveWriter(
+    batch_size=settings.MOVE_WRITER_BATCH_SIZE,
+    flush_interval=settings.MOVE_WRITER_FLUSH_SECONDS,
+    max_buffer=settings.MOVE_WRITER_MAX_BUFFER,
+)
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from passlib.context import CryptContext
+from app.config import get_settings
+
+settings = get_settings()
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# Module-level so they can be pickled into worker processes
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when too many password operations are already pending"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a process pool so it never stalls the event loop.
+
+    Pending operations are capped; callers past the cap get PasswordPoolBusy
+    and should answer 429.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, plain_password, hashed_password)
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordPoolBusy()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        self._pending += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.completed += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_ms": round(self.total_ms / self.completed, 2) if self.completed else 0.0,
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
@@ -0,0 +1,114 @@
+import json
+from collections import OrderedDict
+from typing import Any, Optional
+
+import chess
+import chess.polyglot
+import redis.asyncio as redis
+from app.config import get_settings
+
+settings = get_settings()
+
+POSITION_CACHE_PREFIX = "chess:position:"
+
+
+def position_key(fen: str) -> str:
+    """Zobrist hash of the position, ignoring the move counters in the FEN"""
+    return f"{chess.polyglot.zobrist_hash(chess.Board(fen)):016x}"
+
+
+class PositionCache:
+    """
+    Engine results keyed by (kind, position hash, depth).
+
+    Lookups go through an in-process LRU first, then an optional Redis tier
+    shared by all nodes. Best moves can also come from a polyglot opening book.
+    """
+
+    def __init__(self, max_entries: int, redis_ttl: int):
+        self.max_entries = max_entries
+        self.redis_ttl = redis_ttl
+        self.redis: Optional[redis.Redis] = None
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._book: Optional[chess.polyglot.MemoryMappedReader] = None
+        self.hits = 0
+        self.misses = 0
+        self.redis_hits = 0
+        self.book_hits = 0
+
+    def attach_redis(self, redis_client: redis.Redis):
+        """Enable the shared Redis tier"""
+        self.redis = redis_client
+
+    def load_book(self, path: str):
+        """Open a polyglot opening book used for best-move lookups"""
+        try:
+            self._book = chess.polyglot.open_reader(path)
+        except OSError as e:
+            print(f"Failed to open opening book: {e}")
+
+    def close(self):
+        if self._book is not None:
+            self._book.close()
+            self._book = None
+
+    def book_move(self, fen: str) -> Optional[str]:
+        """Highest-weighted book move for the position, if any"""
+        if self._book is None:
+            return None
+        entry = self._book.get(chess.Board(fen))
+        if entry is None:
+            return None
+        self.book_hits += 1
+        return entry.move.uci()
+
+    async def get(self, kind: str, fen: str, depth: int) -> Optional[Any]:
+        key = f"{kind}:{position_key(fen)}:{depth}"
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(f"{POSITION_CACHE_PREFIX}{key}")
+            except Exception:
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self._store(key, value)
+                self.redis_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, kind: str, fen: str, depth: int, value: Any):
+        key = f"{kind}:{position_key(fen)}:{depth}"
+        self._store(key, value)
+        if self.redis is not None:
+            try:
+                await self.redis.setex(f"{POSITION_CACHE_PREFIX}{key}", self.redis_ttl, json.dumps(value))
+            except Exception:
+                pass
+
+    def _store(self, key: str, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "book_hits": self.book_hits,
+            "misses": self.misses,
+        }
+
+
+position_cache = PositionCache(
+    max_entries=settings.POSITION_CACHE_SIZE,
+    redis_ttl=settings.POSITION_CACHE_TTL_SECONDS,
+)
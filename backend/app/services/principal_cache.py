@@ -0,0 +1,51 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class PrincipalCache:
+    """
+    Bounded TTL/LRU cache of authenticated users.
+
+    One entry per user id, valid only for the token it was stored with.
+    Entries are dropped explicitly when a user's points or profile change.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # user_id -> (token, expires_at, user)
+        self._entries: OrderedDict[int, tuple[str, float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, token: str) -> Optional[Any]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] != token or entry[1] <= time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, user_id: int, token: str, user: Any):
+        self._entries[user_id] = (token, time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids: int):
+        for user_id in user_ids:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+principal_cache = PrincipalCache(
+    max_entries=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
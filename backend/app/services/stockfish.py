@@ -1,75 +1,185 @@
-from stockfish import Stockfish
+import asyncio
+import random
+import chess
+import chess.engine
 from typing import Optional
 from app.config import get_settings
+from app.services.position_cache import position_cache
 
 settings = get_settings()
 
 
-class StockfishService:
-    _instance: Optional[Stockfish] = None
-    
-    @classmethod
-    def get_engine(cls) -> Optional[Stockfish]:
-        """Get or create Stockfish instance"""
-        if cls._instance is None:
+class EnginePoolBusy(Exception):
+    """Raised when too many engine requests are already pending"""
+
+
+class EnginePool:
+    """
+    Pool of UCI engine subprocesses driven asynchronously.
+
+    Requests wait for an idle engine, so searches never block the event loop.
+    The number of pending requests is capped; a timed-out or crashed engine is
+    killed and replaced in the background.
+    """
+
+    def __init__(self, path: str, size: int, max_pending: int, timeout: float, options: dict):
+        self.path = path
+        self.size = size
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.options = options
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._alive = 0
+        self._pending = 0
+        # Replacements in flight; the event loop only keeps weak references to tasks
+        self._replacing: set[asyncio.Task] = set()
+
+    @property
+    def available(self) -> bool:
+        return self._alive > 0
+
+    async def start(self):
+        """Launch the engine processes"""
+        for _ in range(self.size):
+            engine = await self._spawn()
+            if engine is not None:
+                self._alive += 1
+                self._idle.put_nowait(engine)
+
+    async def close(self):
+        """Quit all idle engines, once pending replacements have finished"""
+        await asyncio.gather(*self._replacing, return_exceptions=True)
+        while not self._idle.empty():
+            await self._quit(self._idle.get_nowait())
+        self._alive = 0
+
+    async def play(self, fen: str, depth: int) -> Optional[str]:
+        """Return the best move in UCI format"""
+        board = chess.Board(fen)
+        result = await self._run(lambda engine: engine.play(board, chess.engine.Limit(depth=depth)))
+        return result.move.uci() if result.move else None
+
+    async def analyse(self, fen: str, depth: int) -> dict:
+        """Return the evaluation from white's point of view"""
+        board = chess.Board(fen)
+        info = await self._run(lambda engine: engine.analyse(board, chess.engine.Limit(depth=depth)))
+        score = info["score"].white()
+        if score.is_mate():
+            return {"type": "mate", "value": score.mate()}
+        return {"type": "cp", "value": score.score()}
+
+    async def _run(self, search):
+        if self._pending >= self.max_pending:
+            raise EnginePoolBusy()
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.timeout
+            engine = await asyncio.wait_for(self._idle.get(), self.timeout)
             try:
-                cls._instance = Stockfish(
-                    path=settings.STOCKFISH_PATH,
-                    depth=settings.STOCKFISH_DEPTH,
-                    parameters={
-                        "Threads": 2,
-                        "Minimum Thinking Time": 30
-                    }
-                )
-            except Exception as e:
-                print(f"Failed to initialize Stockfish: {e}")
-                return None
-        return cls._instance
-    
+                result = await asyncio.wait_for(search(engine), max(deadline - loop.time(), 0.01))
+            except BaseException:
+                # The engine may be mid-search or dead; never hand it out again
+                task = asyncio.create_task(self._replace(engine))
+                self._replacing.add(task)
+                task.add_done_callback(self._replacing.discard)
+                raise
+            self._idle.put_nowait(engine)
+            return result
+        finally:
+            self._pending -= 1
+
+    async def _spawn(self) -> Optional[chess.engine.UciProtocol]:
+        try:
+            _, engine = await chess.engine.popen_uci(self.path)
+            await engine.configure(self.options)
+            return engine
+        except Exception as e:
+            print(f"Failed to start engine: {e}")
+            return None
+
+    async def _replace(self, engine: chess.engine.UciProtocol):
+        await self._quit(engine)
+        new_engine = await self._spawn()
+        if new_engine is None:
+            self._alive -= 1
+            return
+        self._idle.put_nowait(new_engine)
+
+    async def _quit(self, engine: chess.engine.UciProtocol):
+        try:
+            await asyncio.wait_for(engine.quit(), 1.0)
+        except Exception:
+            pass
+
+
+engine_pool = EnginePool(
+    path=settings.STOCKFISH_PATH,
+    size=settings.STOCKFISH_POOL_SIZE,
+    max_pending=settings.STOCKFISH_MAX_PENDING,
+    timeout=settings.STOCKFISH_TIMEOUT_SECONDS,
+    options={"Threads": settings.STOCKFISH_THREADS},
+)
+
+
+class StockfishService:
+    depth: int = settings.STOCKFISH_DEPTH
+
     @classmethod
-    def get_best_move(cls, fen: str) -> Optional[str]:
+    async def get_best_move(cls, fen: str) -> Optional[str]:
         """Get the best move for the current position"""
-        engine = cls.get_engine()
-        if engine is None:
+        book_move = position_cache.book_move(fen)
+        if book_move:
+            return book_move
+
+        cached = await position_cache.get("move", fen, cls.depth)
+        if cached:
+            return cached
+
+        if not engine_pool.available:
             # Fallback: return a random legal move
             return cls._get_random_move(fen)
-        
+
         try:
-            engine.set_fen_position(fen)
-            return engine.get_best_move()
+            move = await engine_pool.play(fen, cls.depth)
+            if move:
+                await position_cache.set("move", fen, cls.depth, move)
+            return move
+        except EnginePoolBusy:
+            print("Stockfish pool busy, playing a random move")
+            return cls._get_random_move(fen)
         except Exception as e:
-            print(f"Stockfish error: {e}")
+            print(f"Stockfish error: {e!r}")
             return cls._get_random_move(fen)
-    
+
     @classmethod
     def _get_random_move(cls, fen: str) -> Optional[str]:
         """Fallback: get a random legal move using python-chess"""
-        import chess
-        import random
-        
         board = chess.Board(fen)
         legal_moves = list(board.legal_moves)
         if legal_moves:
             return random.choice(legal_moves).uci()
         return None
-    
+
     @classmethod
     def set_difficulty(cls, depth: int):
         """Adjust bot difficulty by changing search depth"""
-        engine = cls.get_engine()
-        if engine:
-            engine.set_depth(depth)
-    
+        cls.depth = depth
+
     @classmethod
-    def evaluate_position(cls, fen: str) -> Optional[dict]:
+    async def evaluate_position(cls, fen: str) -> Optional[dict]:
         """Evaluate the current position"""
-        engine = cls.get_engine()
-        if engine is None:
+        cached = await position_cache.get("eval", fen, cls.depth)
+        if cached:
+            return cached
+
+        if not engine_pool.available:
             return None
-        
+
         try:
-            engine.set_fen_position(fen)
-            evaluation = engine.get_evaluation()
+            evaluation = await engine_pool.analyse(fen, cls.depth)
+            await position_cache.set("eval", fen, cls.depth, evaluation)
             return evaluation
         except Exception:
             return None
@@ -0,0 +1,128 @@
+import asyncio
+import math
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+from app.config import get_settings
+
+settings = get_settings()
+
+# 4 levels of 64 slots: at a 100 ms tick the wheel spans 64**4 ticks (~19 days)
+LEVEL_BITS = 6
+SLOTS = 1 << LEVEL_BITS
+SLOT_MASK = SLOTS - 1
+LEVELS = 4
+MAX_TICKS = SLOTS ** LEVELS - 1
+
+
+class Timer:
+    __slots__ = ("key", "expires", "callback", "args", "cancelled")
+
+    def __init__(self, key: Hashable, expires: int, callback: Callable[..., Awaitable[Any]], args: tuple):
+        self.key = key
+        self.expires = expires  # Absolute tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel driving many timers from one task.
+
+    Scheduling and cancelling are O(1). Each tick only looks at one slot of
+    the innermost wheel; outer wheels are cascaded inwards when the inner one
+    wraps. Timers fire within one tick of their deadline. One timer per key:
+    scheduling a key again replaces its previous timer.
+    """
+
+    def __init__(self, tick: float):
+        self.tick = tick
+        self.wheels: list[list[list[Timer]]] = [[[] for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self.timers: dict[Hashable, Timer] = {}
+        self.current = 0  # Ticks processed so far
+        self._origin = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        # Callbacks in flight; the event loop only keeps weak references to tasks
+        self._firing: set[asyncio.Task] = set()
+        self.fired = 0
+
+    def start(self):
+        if self._task is None:
+            self._origin = time.monotonic() - self.current * self.tick
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable[..., Awaitable[Any]], *args):
+        """Run `await callback(*args)` after `delay` seconds"""
+        self.cancel(key)
+        ticks = max(1, math.ceil(delay / self.tick))
+        timer = Timer(key, self.current + min(ticks, MAX_TICKS), callback, args)
+        self.timers[key] = timer
+        self._insert(timer)
+
+    def cancel(self, key: Hashable):
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            # Left in its slot and skipped when reached
+            timer.cancelled = True
+
+    def _insert(self, timer: Timer):
+        delta = timer.expires - self.current
+        for level in range(LEVELS):
+            if delta < SLOTS ** (level + 1) or level == LEVELS - 1:
+                slot = (timer.expires >> (LEVEL_BITS * level)) & SLOT_MASK
+                self.wheels[level][slot].append(timer)
+                return
+
+    def _advance(self):
+        self.current += 1
+        # Cascade outer wheels whose slot just came round, outermost first,
+        # so their timers can land in the slots processed below
+        for level in range(LEVELS - 1, 0, -1):
+            if self.current & ((1 << (LEVEL_BITS * level)) - 1) == 0:
+                slot = (self.current >> (LEVEL_BITS * level)) & SLOT_MASK
+                timers, self.wheels[level][slot] = self.wheels[level][slot], []
+                for timer in timers:
+                    if not timer.cancelled:
+                        self._insert(timer)
+
+        slot = self.current & SLOT_MASK
+        timers, self.wheels[0][slot] = self.wheels[0][slot], []
+        for timer in timers:
+            if timer.cancelled:
+                continue
+            if timer.expires > self.current:
+                # Clamped to the wheel's span; wait another lap
+                self._insert(timer)
+                continue
+            del self.timers[timer.key]
+            self.fired += 1
+            task = asyncio.create_task(self._fire(timer))
+            self._firing.add(task)
+            task.add_done_callback(self._firing.discard)
+
+    async def _fire(self, timer: Timer):
+        try:
+            await timer.callback(*timer.args)
+        except Exception as e:
+            print(f"Timer {timer.key!r} failed: {e}")
+
+    async def _run(self):
+        while True:
+            # Catch up on every tick that is due, then sleep until the next one
+            due = int((time.monotonic() - self._origin) / self.tick)
+            while self.current < due:
+                self._advance()
+            next_tick = self._origin + (self.current + 1) * self.tick
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+
+    def stats(self) -> dict:
+        return {"scheduled": len(self.timers), "running": len(self._firing), "fired": self.fired}
+
+
+timer_wheel = TimerWheel(tick=settings.TIMER_WHEEL_TICK_SECONDS)
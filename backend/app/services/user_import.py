@@ -0,0 +1,145 @@
+import asyncio
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional
+from pydantic import ValidationError
+from sqlalchemy import insert, select, or_
+
+from app.database import AsyncSessionLocal
+from app.models import User
+from app.redis_client import get_redis
+from app.schemas import UserCreate
+from app.services.leaderboard import LEADERBOARD_KEY
+from app.services.password_hasher import PasswordHasher
+
+
+@dataclass
+class ImportReport:
+    processed: int = 0
+    imported: int = 0
+    failed: list[tuple[int, str]] = field(default_factory=list)  # (row number, reason)
+
+
+def read_rows(path: str) -> Iterator[tuple[int, dict | Exception]]:
+    """Stream (row number, row) pairs from a CSV or NDJSON file"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            for row_number, row in enumerate(csv.DictReader(f), start=2):
+                yield row_number, row
+            return
+        for row_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield row_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield row_number, e
+
+
+async def import_users(
+    rows: Iterable[tuple[int, dict | Exception]],
+    batch_size: int = 1000,
+    workers: Optional[int] = None,
+    on_progress: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """
+    Create users in batches: duplicates are detected with one query per batch,
+    passwords are hashed in parallel, rows are bulk inserted and the
+    leaderboard is seeded with pipelined ZADDs. Bad rows are reported, not fatal.
+    """
+    report = ImportReport()
+    hasher = PasswordHasher(workers=workers or os.cpu_count() or 1, max_pending=batch_size)
+    seen_usernames: set[str] = set()
+    seen_emails: set[str] = set()
+    batch: list[tuple[int, UserCreate, int]] = []
+
+    try:
+        for row_number, row in rows:
+            report.processed += 1
+            if isinstance(row, Exception):
+                report.failed.append((row_number, f"Unreadable row: {row}"))
+                continue
+            try:
+                user = UserCreate(**row)
+                points = int(row.get("points") or 0)
+            except (ValidationError, TypeError, ValueError) as e:
+                report.failed.append((row_number, f"Invalid row: {e}"))
+                continue
+            if user.username in seen_usernames or user.email in seen_emails:
+                report.failed.append((row_number, "Duplicate in import file"))
+                continue
+            seen_usernames.add(user.username)
+            seen_emails.add(user.email)
+
+            batch.append((row_number, user, points))
+            if len(batch) >= batch_size:
+                await _import_batch(batch, hasher, report)
+                batch = []
+                if on_progress:
+                    on_progress(report)
+
+        if batch:
+            await _import_batch(batch, hasher, report)
+            if on_progress:
+                on_progress(report)
+    finally:
+        hasher.shutdown()
+
+    return report
+
+
+async def _import_batch(batch: list[tuple[int, UserCreate, int]], hasher: PasswordHasher, report: ImportReport):
+    # Drop rows that clash with existing accounts (one query for the whole batch)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(User.username, User.email).where(or_(
+                User.username.in_([u.username for _, u, _ in batch]),
+                User.email.in_([u.email for _, u, _ in batch]),
+            ))
+        )
+        taken = result.all()
+    taken_usernames = {username for username, _ in taken}
+    taken_emails = {email for _, email in taken}
+
+    fresh = []
+    for row_number, user, points in batch:
+        if user.username in taken_usernames:
+            report.failed.append((row_number, "Username already registered"))
+        elif user.email in taken_emails:
+            report.failed.append((row_number, "Email already registered"))
+        else:
+            fresh.append((row_number, user, points))
+    if not fresh:
+        return
+
+    hashes = await asyncio.gather(*(hasher.hash(user.password) for _, user, _ in fresh))
+    values = [
+        {"username": user.username, "email": user.email, "password_hash": password_hash, "points": points}
+        for (_, user, points), password_hash in zip(fresh, hashes)
+    ]
+
+    try:
+        created = await _insert_users(values)
+    except Exception:
+        # Isolate the offending rows (e.g. accounts registered concurrently)
+        created = []
+        for (row_number, _, _), row in zip(fresh, values):
+            try:
+                created.extend(await _insert_users([row]))
+            except Exception as e:
+                report.failed.append((row_number, f"Insert failed: {e.__class__.__name__}"))
+
+    if created:
+        redis_client = await get_redis()
+        await redis_client.zadd(LEADERBOARD_KEY, {f"{user_id}:{username}": points for user_id, username, points in created})
+    report.imported += len(created)
+
+
+async def _insert_users(values: list[dict]) -> list[tuple[int, str, int]]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(insert(User).returning(User.id, User.username, User.points), values)
+        created = [tuple(row) for row in result.all()]
+        await db.commit()
+    return created
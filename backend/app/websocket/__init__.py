@@ -1,3 +1,7 @@
-from app.websocket.game_ws import manager, handle_game_websocket, ConnectionManager
+from app.websocket.game_ws import manager, handle_game_websocket, ConnectionManager, schedule_abandon_check
+from app.websocket.spectators import spectator_hub, handle_spectator_websocket, SpectatorHub
 
-__all__ = ["manager", "handle_game_websocket", "ConnectionManager"]
+__all__ = [
+    "manager", "handle_game_websocket", "ConnectionManager", "schedule_abandon_check",
+    "spectator_hub", "handle_spectator_websocket", "SpectatorHub"
+]
@@ -0,0 +1,122 @@
+import json
+import asyncio
+from typing import Callable, Optional, Union
+from fastapi import WebSocket
+
+from app.config import get_settings
+from app.websocket import protocol
+
+settings = get_settings()
+
+# Close code sent to clients that cannot keep up (RFC 6455 "try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# Socket closes in flight; the event loop only keeps weak references to tasks
+_closing: set[asyncio.Task] = set()
+
+
+class ClientConnection:
+    """
+    One WebSocket with its own bounded send queue and writer task.
+
+    Senders only enqueue already-serialized frames, so a stalled client never
+    holds up anyone else. A full queue or a failed/timed-out send closes the
+    connection and calls on_close so the owner can drop it. Connections that
+    negotiated the binary subprotocol get binary frames where one is defined.
+
+    Sequenced frames at or below the last one queued are skipped, and a held
+    connection buffers live frames until release() puts the initial state or
+    replay in front of them.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_close: Optional[Callable[["ClientConnection"], None]] = None,
+        max_queue: int = settings.WS_SEND_QUEUE_SIZE,
+        send_timeout: float = settings.WS_SEND_TIMEOUT_SECONDS,
+        binary: bool = False,
+        held: bool = False,
+    ):
+        self.websocket = websocket
+        self.binary = binary
+        self.on_close = on_close
+        self.send_timeout = send_timeout
+        self.closed = False
+        self.evicted = False
+        # Below any real seq: a new game's initial state is sent with seq 0
+        self.last_seq = -1
+        self._held: Optional[list[tuple[Union[str, bytes], Optional[int]]]] = [] if held else None
+        self._queue: asyncio.Queue[Union[str, bytes]] = asyncio.Queue(maxsize=max_queue)
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def send_text(self, text: Union[str, bytes], seq: Optional[int] = None) -> bool:
+        """Queue a serialized frame (text or binary); returns False if the connection is gone"""
+        if self.closed:
+            return False
+        if self._held is not None:
+            if len(self._held) >= self._queue.maxsize:
+                self.evicted = True
+                self.close(SLOW_CONSUMER_CLOSE_CODE, "Slow consumer")
+                return False
+            self._held.append((text, seq))
+            return True
+        if seq is not None:
+            if seq <= self.last_seq:
+                # Already delivered (e.g. in a replay)
+                return True
+            self.last_seq = seq
+        try:
+            self._queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self.evicted = True
+            self.close(SLOW_CONSUMER_CLOSE_CODE, "Slow consumer")
+            return False
+        return True
+
+    def release(self, frames: list[tuple[Union[str, bytes], Optional[int]]]):
+        """Queue the initial frames, then everything held back since connecting"""
+        held, self._held = self._held or [], None
+        for frame, seq in frames + held:
+            self.send_text(frame, seq)
+
+    def encode(self, message: dict) -> Union[str, bytes]:
+        frame = protocol.encode(message) if self.binary else None
+        return frame if frame is not None else json.dumps(message)
+
+    async def send_json(self, message: dict) -> bool:
+        return self.send_text(self.encode(message))
+
+    async def _write_loop(self):
+        try:
+            while True:
+                frame = await self._queue.get()
+                if isinstance(frame, bytes):
+                    send = self.websocket.send_bytes(frame)
+                else:
+                    send = self.websocket.send_text(frame)
+                await asyncio.wait_for(send, timeout=self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Dead socket or send timeout
+            self.close()
+
+    def close(self, code: int = 1000, reason: str = ""):
+        if self.closed:
+            return
+        self.closed = True
+        if asyncio.current_task() is not self._writer:
+            self._writer.cancel()
+        task = asyncio.create_task(self._close_socket(code, reason))
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+        if self.on_close is not None:
+            self.on_close(self)
+
+    async def _close_socket(self, code: int, reason: str):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code, reason=reason), timeout=self.send_timeout)
+        except Exception:
+            # Already closed by the client
+            pass
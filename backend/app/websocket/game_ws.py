@@ -1,66 +1,333 @@
 import json
+import time
 import asyncio
+import chess
+import redis.asyncio as redis
 from datetime import datetime, timezone
+from typing import Optional
 from fastapi import WebSocket, WebSocketDisconnect, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import delete, update, case
 
 from app.database import AsyncSessionLocal
 from app.redis_client import get_redis
-from app.models import User, Game, GameMove
-from app.services import get_game, remove_game, StockfishService, update_points
+from app.models import User, Game, GameMove, GameLog
+from app.services.chess_game import GAME_KEY
+from app.services import timer_wheel
+from app.services import ChessGame, get_game, save_move, remove_game, reinstate_game, StockfishService, update_points_many, move_writer, move_log, principal_cache
 from app.config import get_settings
+from app.websocket import protocol
+from app.websocket.connection import ClientConnection
+from app.websocket.spectators import spectator_hub
 
 settings = get_settings()
 
+# Number a game event, keep it in the game's bounded replay buffer and publish
+# it on the game's channel, atomically, so every worker sees events in sequence
+# order. The sequence number is spliced into the already-serialized message,
+# which is published as is.
+# KEYS: seq counter, replay list. ARGV: message, buffer size, ttl, channel
+PUBLISH_EVENT_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+local message = '{"seq":' .. seq .. ',' .. string.sub(ARGV[1], 2)
+redis.call('RPUSH', KEYS[2], message)
+redis.call('LTRIM', KEYS[2], -tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('PUBLISH', ARGV[4], message)
+return seq
+"""
+
+# Events after ARGV[1] as {current seq, 1, events...}, or {current seq, 0}
+# when they are no longer all in the buffer (the client needs a snapshot).
+REPLAY_EVENTS_SCRIPT = """
+local seq = tonumber(redis.call('GET', KEYS[1]) or '0')
+local since = tonumber(ARGV[1])
+local count = redis.call('LLEN', KEYS[2])
+local missing = seq - since
+if since > seq or missing > count then
+    return {seq, 0}
+end
+local result = {seq, 1}
+if missing > 0 then
+    local events = redis.call('LRANGE', KEYS[2], count - missing, -1)
+    for i = 1, #events do
+        result[#result + 1] = events[i]
+    end
+end
+return result
+"""
+
+# Unsubscribe from games with no local sockets or viewers this often
+UNWATCH_INTERVAL_SECONDS = 5.0
+
+
+def _event_keys(game_id: int) -> list[str]:
+    return [f"{GAME_KEY}{game_id}:seq", f"{GAME_KEY}{game_id}:events"]
+
+
+def _event_channel(game_id: int) -> str:
+    """Pub/sub channel of one game: public events as is, private ones as <user_id>|<message>"""
+    return f"{GAME_KEY}{game_id}:channel"
+
+
+def _channel_game(channel: str) -> int:
+    return int(channel[len(GAME_KEY):-len(":channel")])
+
 
 class ConnectionManager:
-    """Manages WebSocket connections for games"""
+    """
+    Manages WebSocket connections for games.
+
+    Messages are published on a per-game Redis channel, and each worker only
+    subscribes to the games it has sockets or spectators for, so the two
+    players of a game can be connected to different workers or nodes while a
+    worker never sees traffic for games it doesn't serve. Game-wide events
+    carry a per-game sequence number and are kept in a short replay buffer,
+    so a reconnecting client can ask for just what it missed.
+    """
     
     def __init__(self):
-        # game_id -> {user_id: websocket}
-        self.active_connections: dict[int, dict[int, WebSocket]] = {}
-    
-    async def connect(self, websocket: WebSocket, game_id: int, user_id: int):
-        await websocket.accept()
-        if game_id not in self.active_connections:
-            self.active_connections[game_id] = {}
-        self.active_connections[game_id][user_id] = websocket
+        # game_id -> {user_id: connection}
+        self.active_connections: dict[int, dict[int, ClientConnection]] = {}
+        self.redis: Optional[redis.Redis] = None
+        self._pubsub = None
+        # game_id -> resolved once Redis has confirmed the subscription
+        self._subscribed: dict[int, asyncio.Future] = {}
+        self._watching = asyncio.Event()
+        self._listener: Optional[asyncio.Task] = None
+        self._publish_script = None
+        self._replay_script = None
+        self.evicted = 0
+        self.dropped = 0
+    
+    async def start(self, redis_client: redis.Redis):
+        """Start relaying game events published by any worker"""
+        self.redis = redis_client
+        self._publish_script = redis_client.register_script(PUBLISH_EVENT_SCRIPT)
+        self._replay_script = redis_client.register_script(REPLAY_EVENTS_SCRIPT)
+        if self._listener is None:
+            self._pubsub = redis_client.pubsub()
+            self._listener = asyncio.create_task(self._listen())
+    
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        self._subscribed.clear()
+        self.redis = None
+    
+    async def connect(self, websocket: WebSocket, game_id: int, user_id: int) -> ClientConnection:
+        subprotocol = protocol.select_subprotocol(websocket)
+        await websocket.accept(subprotocol=subprotocol)
+        # Held until the caller has queued the initial state or replay
+        conn = ClientConnection(
+            websocket,
+            on_close=lambda c: self._forget(game_id, user_id, c),
+            binary=subprotocol == protocol.BINARY_SUBPROTOCOL,
+            held=True
+        )
+        previous = self.active_connections.setdefault(game_id, {}).get(user_id)
+        self.active_connections[game_id][user_id] = conn
+        if previous is not None:
+            # Same player reconnected (e.g. another tab): the old socket is retired
+            previous.close(1000, "Replaced by a new connection")
+        # Subscribed before the caller reads the game's state, so no event falls in between
+        try:
+            await self.watch(game_id)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+    
+    async def watch(self, game_id: int):
+        """Receive a game's events on this worker; returns once the subscription is active"""
+        if self.redis is None:
+            return
+        ready = self._subscribed.get(game_id)
+        if ready is None:
+            ready = self._subscribed[game_id] = asyncio.get_running_loop().create_future()
+            await self._pubsub.subscribe(_event_channel(game_id))
+            self._watching.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(ready), timeout=settings.WS_SEND_TIMEOUT_SECONDS)
+        except TimeoutError:
+            print(f"Subscription to game {game_id} events not confirmed")
+    
+    def _local_games(self) -> set[int]:
+        return set(self.active_connections) | set(spectator_hub.channels)
     
     def disconnect(self, game_id: int, user_id: int):
-        if game_id in self.active_connections:
-            if user_id in self.active_connections[game_id]:
-                del self.active_connections[game_id][user_id]
-            if not self.active_connections[game_id]:
-                del self.active_connections[game_id]
+        conn = self.active_connections.get(game_id, {}).get(user_id)
+        if conn is not None:
+            conn.close()
+    
+    def _forget(self, game_id: int, user_id: int, conn: ClientConnection):
+        """Drop a closed connection, unless it was already replaced"""
+        connections = self.active_connections.get(game_id)
+        if connections is None or connections.get(user_id) is not conn:
+            return
+        del connections[user_id]
+        if not connections:
+            # The listener unsubscribes from the game later, if nobody else here needs it
+            del self.active_connections[game_id]
+        if conn.evicted:
+            self.evicted += 1
     
     async def send_to_game(self, game_id: int, message: dict):
         """Send message to all players in a game"""
-        if game_id in self.active_connections:
-            for websocket in self.active_connections[game_id].values():
-                try:
-                    await websocket.send_json(message)
-                except:
-                    pass
+        await self._publish(game_id, None, message)
     
     async def send_to_player(self, game_id: int, user_id: int, message: dict):
         """Send message to a specific player"""
-        if game_id in self.active_connections:
-            if user_id in self.active_connections[game_id]:
-                try:
-                    await self.active_connections[game_id][user_id].send_json(message)
-                except:
-                    pass
+        await self._publish(game_id, user_id, message)
+    
+    async def _publish(self, game_id: int, user_id: Optional[int], message: dict):
+        # Serialized once here; every worker forwards the same text to its sockets
+        text = json.dumps(message)
+        if self.redis is None:
+            self._deliver(game_id, user_id, text)
+            return
+        if user_id is None:
+            await self._publish_script(
+                keys=_event_keys(game_id),
+                args=[text, settings.WS_REPLAY_BUFFER_SIZE, settings.GAME_STATE_TTL_SECONDS, _event_channel(game_id)]
+            )
+            return
+        await self.redis.publish(_event_channel(game_id), f"{user_id}|{text}")
+    
+    async def replay(self, game_id: int, since: int) -> tuple[int, Optional[list[str]]]:
+        """Current sequence number, and the events after `since` (None if they have rolled over)"""
+        if self.redis is None:
+            return 0, None
+        seq, complete, *events = await self._replay_script(keys=_event_keys(game_id), args=[since])
+        return int(seq), events if complete else None
+    
+    async def current_seq(self, game_id: int) -> int:
+        if self.redis is None:
+            return 0
+        return int(await self.redis.get(_event_keys(game_id)[0]) or 0)
+    
+    async def _listen(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pubsub = self._pubsub
+            try:
+                # (Re)subscribe to every game served here; pending watchers keep their futures
+                previous = self._subscribed
+                self._subscribed = {
+                    game_id: previous[game_id] if game_id in previous and not previous[game_id].done() else loop.create_future()
+                    for game_id in self._local_games()
+                }
+                if self._subscribed:
+                    await pubsub.subscribe(*map(_event_channel, self._subscribed))
+                next_unwatch = loop.time() + UNWATCH_INTERVAL_SECONDS
+                while True:
+                    if loop.time() >= next_unwatch:
+                        await self._unwatch_idle(pubsub)
+                        next_unwatch = loop.time() + UNWATCH_INTERVAL_SECONDS
+                    if not pubsub.subscribed:
+                        # Nothing to listen to until a game is watched
+                        self._watching.clear()
+                        try:
+                            await asyncio.wait_for(self._watching.wait(), timeout=1.0)
+                        except TimeoutError:
+                            pass
+                        continue
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Game event listener error: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+                if self.redis is not None:
+                    self._pubsub = self.redis.pubsub()
+    
+    def _dispatch(self, message: dict):
+        game_id = _channel_game(message["channel"])
+        if message["type"] == "subscribe":
+            ready = self._subscribed.get(game_id)
+            if ready is not None and not ready.done():
+                ready.set_result(None)
+            return
+        if message["type"] != "message":
+            return
+        if game_id not in self.active_connections and game_id not in spectator_hub.channels:
+            return
+        data = message["data"]
+        if data.startswith("{"):
+            self._deliver(game_id, None, data, protocol.event_seq(data))
+        else:
+            user_id, _, text = data.partition("|")
+            self._deliver(game_id, int(user_id), text)
+    
+    async def _unwatch_idle(self, pubsub):
+        """Unsubscribe from games that no longer have sockets or viewers on this worker"""
+        idle = [
+            game_id for game_id, ready in self._subscribed.items()
+            if ready.done() and game_id not in self.active_connections and game_id not in spectator_hub.channels
+        ]
+        if idle:
+            for game_id in idle:
+                del self._subscribed[game_id]
+            await pubsub.unsubscribe(*map(_event_channel, idle))
+    
+    def _deliver(self, game_id: int, user_id: Optional[int], text: str, seq: Optional[int] = None):
+        """Queue a frame on the sockets connected to this worker (never blocks)"""
+        connections = self.active_connections.get(game_id, {})
+        if user_id is not None:
+            targets = [connections[user_id]] if user_id in connections else []
+        else:
+            targets = list(connections.values())
+        # Binary frame built at most once per event, and only if someone here wants it
+        frame = None
+        for conn in targets:
+            if conn.binary:
+                if frame is None:
+                    frame = protocol.encode(json.loads(text)) or text
+                sent = conn.send_text(frame, seq)
+            else:
+                sent = conn.send_text(text, seq)
+            if not sent:
+                self.dropped += 1
+        # Public events also go to spectators, after the players
+        if user_id is None:
+            spectator_hub.publish(game_id, text)
+    
+    def stats(self) -> dict:
+        return {
+            "games": len(self.active_connections),
+            "connections": sum(len(c) for c in self.active_connections.values()),
+            "subscribed_games": len(self._subscribed),
+            "evicted": self.evicted,
+            "dropped": self.dropped
+        }
 
 
 manager = ConnectionManager()
+# Spectator channels subscribe to their game's events through the manager
+spectator_hub.events = manager
+
 
+def _resume_frames(conn: ClientConnection, seq: int, events: list[str]) -> list[tuple]:
+    """Missed events: one "resume" message for JSON clients, one frame each for binary"""
+    if conn.binary:
+        first = seq - len(events) + 1
+        return [(protocol.encode(json.loads(e)) or e, first + i) for i, e in enumerate(events)]
+    # Events are already serialized; splice them in rather than re-encoding
+    return [(f'{{"type": "resume", "seq": {seq}, "events": [{", ".join(events)}]}}', seq)]
 
-async def handle_game_websocket(websocket: WebSocket, game_id: int, user_id: int):
+
+async def handle_game_websocket(websocket: WebSocket, game_id: int, user_id: int, since: Optional[int] = None):
     """Main WebSocket handler for chess games"""
     
-    # Get game from memory
-    game = get_game(game_id)
+    # Get game from the shared store
+    game = await get_game(game_id)
     if not game:
         await websocket.close(code=4004, reason="Game not found")
         return
@@ -70,71 +337,106 @@ async def handle_game_websocket(websocket: WebSocket, game_id: int, user_id: int
         await websocket.close(code=4003, reason="Not authorized")
         return
     
-    # Connect
-    await manager.connect(websocket, game_id, user_id)
+    # Connect (live events are held back until the initial frames are queued)
+    conn = await manager.connect(websocket, game_id, user_id)
     
     # Determine player color
     player_color = "white" if user_id == game.white_player_id else "black"
-    
-    # Send initial state
-    await websocket.send_json({
-        "type": "game_state",
-        "game_id": game_id,
-        "fen": game.get_fen(),
-        "turn": game.get_current_turn(),
-        "your_color": player_color,
-        "legal_moves": game.get_legal_moves() if game.get_current_turn() == player_color else [],
-        "is_bot_game": game.is_bot_game
-    })
+    present = False
     
     try:
+        # A resuming client only gets the events it missed, if they are still buffered
+        events = None
+        if since is not None:
+            seq, events = await manager.replay(game_id, since)
+        
+        if events is not None:
+            conn.release(_resume_frames(conn, seq, events))
+        else:
+            # Full state, read after the sequence number so it is at least that recent
+            seq = await manager.current_seq(game_id)
+            game = await get_game(game_id) or game
+            conn.release([(conn.encode({
+                "type": "game_state",
+                "game_id": game_id,
+                "seq": seq,
+                "fen": game.get_fen(),
+                "ply": game.ply,
+                "turn": game.get_current_turn(),
+                "your_color": player_color,
+                "legal_moves": game.get_legal_moves() if game.get_current_turn() == player_color else [],
+                "clock": game.get_clock(),
+                "is_bot_game": game.is_bot_game
+            }), seq)])
+        
+        await mark_presence(game_id, user_id, 1)
+        present = True
+        schedule_flag_check(game)
+        
         while True:
-            data = await websocket.receive_json()
-            await process_message(websocket, game_id, user_id, player_color, data)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is not None:
+                data = protocol.decode(message["bytes"])
+            else:
+                data = json.loads(message["text"])
+            await process_message(conn, game_id, user_id, player_color, data)
     except WebSocketDisconnect:
-        manager.disconnect(game_id, user_id)
-        # Notify opponent of disconnect
-        await manager.send_to_game(game_id, {
-            "type": "opponent_disconnected",
-            "message": f"{player_color} player disconnected"
-        })
+        # A socket replaced by the same player's new connection is not a disconnect
+        current = manager.active_connections.get(game_id, {}).get(user_id)
+        replaced = current is not None and current is not conn
+        conn.close()
+        if not replaced:
+            # Notify opponent of disconnect
+            await manager.send_to_game(game_id, {
+                "type": "opponent_disconnected",
+                "message": f"{player_color} player disconnected"
+            })
+    finally:
+        # Also reached if the initial state or replay failed: never leave a held connection behind
+        conn.close()
+        if present:
+            await mark_presence(game_id, user_id, -1)
+        # Forfeit unless the player (or another tab) is back in time
+        schedule_abandon_check(game_id)
 
 
-async def process_message(websocket: WebSocket, game_id: int, user_id: int, player_color: str, data: dict):
+async def process_message(conn: ClientConnection, game_id: int, user_id: int, player_color: str, data: dict):
     """Process incoming WebSocket messages"""
     
-    game = get_game(game_id)
+    game = await get_game(game_id)
     if not game:
-        await websocket.send_json({"type": "error", "message": "Game not found"})
+        await conn.send_json({"type": "error", "message": "Game not found"})
         return
     
     msg_type = data.get("type")
     
     if msg_type == "move":
-        await handle_move(websocket, game_id, user_id, player_color, data.get("move"))
+        await handle_move(conn, game, user_id, player_color, data.get("move"))
     
     elif msg_type == "resign":
         await handle_resign(game_id, user_id, player_color)
     
     elif msg_type == "get_state":
-        await websocket.send_json({
+        await conn.send_json({
             "type": "game_state",
             "fen": game.get_fen(),
+            "ply": game.ply,
             "turn": game.get_current_turn(),
-            "legal_moves": game.get_legal_moves() if game.get_current_turn() == player_color else []
+            "legal_moves": game.get_legal_moves() if game.get_current_turn() == player_color else [],
+            "clock": game.get_clock()
         })
 
 
-async def handle_move(websocket: WebSocket, game_id: int, user_id: int, player_color: str, move_uci: str):
+async def handle_move(conn: ClientConnection, game: ChessGame, user_id: int, player_color: str, move_uci: str):
     """Handle a chess move"""
     
-    game = get_game(game_id)
-    if not game:
-        return
+    game_id = game.game_id
     
     # Check if it's player's turn
     if game.get_current_turn() != player_color:
-        await websocket.send_json({
+        await conn.send_json({
             "type": "error",
             "message": "Not your turn"
         })
@@ -144,34 +446,38 @@ async def handle_move(websocket: WebSocket, game_id: int, user_id: int, player_c
     result = game.make_move(move_uci)
     
     if not result["success"]:
-        await websocket.send_json({
+        await conn.send_json({
             "type": "error",
             "message": result.get("error", "Invalid move")
         })
         return
     
-    # Save move to database
-    async with AsyncSessionLocal() as db:
-        db_move = GameMove(
-            game_id=game_id,
-            move_number=len(game.move_history),
-            move_san=result["move_san"],
-            move_uci=result["move_uci"],
-            fen_after=result["fen"]
-        )
-        db.add(db_move)
-        await db.commit()
+    # Commit to the shared store; fails if another worker changed the game first
+    if not await save_move(game, result["move_uci"]):
+        await conn.send_json({
+            "type": "error",
+            "message": "Game state changed, move rejected"
+        })
+        # The move may have been refused because the mover's flag fell
+        await check_flag(game_id)
+        return
+    
+    # Queue move for the write-behind writer
+    move_writer.add(game_id, game.ply, result["move_san"], result["move_uci"], result["fen"])
     
     # Broadcast move to all players
     await manager.send_to_game(game_id, {
         "type": "move",
+        "ply": game.ply,
         "move_san": result["move_san"],
         "move_uci": result["move_uci"],
         "fen": result["fen"],
         "turn": game.get_current_turn(),
+        "clock": game.get_clock(),
         "is_game_over": result["is_game_over"],
         "result": result.get("result")
     })
+    schedule_flag_check(game)
     
     # Check if game is over
     if result["is_game_over"]:
@@ -187,12 +493,18 @@ async def handle_move(websocket: WebSocket, game_id: int, user_id: int, player_c
 async def make_bot_move(game_id: int):
     """Make a move for the Stockfish bot"""
     
-    game = get_game(game_id)
+    game = await get_game(game_id)
     if not game or game.is_game_over():
         return
+    ply = game.ply
     
     # Get best move from Stockfish
-    bot_move = StockfishService.get_best_move(game.get_fen())
+    bot_move = await StockfishService.get_best_move(game.get_fen())
+    
+    # The game may have ended (e.g. resignation) or been spilled while the engine was searching
+    game = await get_game(game_id)
+    if not game or game.ply != ply or game.is_game_over():
+        return
     
     if not bot_move:
         # Fallback: resign if no move found
@@ -202,30 +514,24 @@ async def make_bot_move(game_id: int):
     # Make the move
     result = game.make_move(bot_move)
     
-    if result["success"]:
-        # Save to database
-        async with AsyncSessionLocal() as db:
-            db_move = GameMove(
-                game_id=game_id,
-                move_number=len(game.move_history),
-                move_san=result["move_san"],
-                move_uci=result["move_uci"],
-                fen_after=result["fen"]
-            )
-            db.add(db_move)
-            await db.commit()
+    if result["success"] and await save_move(game, result["move_uci"]):
+        # Queue move for the write-behind writer
+        move_writer.add(game_id, game.ply, result["move_san"], result["move_uci"], result["fen"])
         
         # Broadcast
         await manager.send_to_game(game_id, {
             "type": "move",
+            "ply": game.ply,
             "move_san": result["move_san"],
             "move_uci": result["move_uci"],
             "fen": result["fen"],
             "turn": game.get_current_turn(),
+            "clock": game.get_clock(),
             "is_game_over": result["is_game_over"],
             "result": result.get("result"),
             "is_bot_move": True
         })
+        schedule_flag_check(game)
         
         if result["is_game_over"]:
             await handle_game_end(game_id, result["result"])
@@ -245,68 +551,177 @@ async def handle_resign(game_id: int, user_id: int, player_color: str):
     await handle_game_end(game_id, winner)
 
 
-async def handle_game_end(game_id: int, result: str):
-    """Handle end of game - update database and points"""
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def schedule_flag_check(game: ChessGame):
+    """(Re)arm the flag timer for the side to move, if its clock is running"""
+    deadline = game.clock_deadline_ms()
+    if deadline is None or game.is_game_over():
+        timer_wheel.cancel(("flag", game.game_id))
+        return
+    timer_wheel.schedule(("flag", game.game_id), max(0, deadline - _now_ms()) / 1000, check_flag, game.game_id)
+
+
+async def check_flag(game_id: int):
+    """Settle the game if the side to move has run out of time"""
+    game = await get_game(game_id)
+    if not game or game.is_game_over():
+        return
+    deadline = game.clock_deadline_ms()
+    if deadline is None:
+        return
+    if deadline > _now_ms():
+        # A move was made elsewhere since the timer was set
+        schedule_flag_check(game)
+        return
     
-    game = get_game(game_id)
+    # Flagging against a side that cannot possibly mate is a draw
+    winner = not game.board.turn
+    if game.board.has_insufficient_material(winner):
+        result = "draw"
+    else:
+        result = "white_wins" if winner == chess.WHITE else "black_wins"
+    await handle_game_end(game_id, result, reason="timeout")
+
+
+def _presence_key(game_id: int) -> str:
+    return f"{GAME_KEY}{game_id}:presence"
+
+
+async def mark_presence(game_id: int, user_id: int, delta: int):
+    """Count a player's open sockets across all workers"""
+    redis_client = await get_redis()
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hincrby(_presence_key(game_id), user_id, delta)
+        pipe.expire(_presence_key(game_id), settings.GAME_STATE_TTL_SECONDS)
+        await pipe.execute()
+
+
+def schedule_abandon_check(game_id: int):
+    timer_wheel.schedule(("abandon", game_id), settings.GAME_ABANDON_SECONDS, check_abandoned, game_id)
+
+
+async def check_abandoned(game_id: int):
+    """Forfeit players who have had no connection for the abandonment timeout"""
+    game = await get_game(game_id)
     if not game:
         return
+    redis_client = await get_redis()
+    white, black = await redis_client.hmget(_presence_key(game_id), game.white_player_id, game.black_player_id or 0)
+    white_here = int(white or 0) > 0
+    black_here = game.is_bot_game or int(black or 0) > 0
+    if white_here and black_here:
+        return
     
+    if not white_here and not black_here:
+        result = "abandoned"
+    else:
+        result = "white_wins" if white_here else "black_wins"
+    await handle_game_end(game_id, result, reason="abandoned")
+
+
+async def _settle(game: ChessGame, result: str, reason: Optional[str], winner_id: Optional[int], deltas: dict) -> list:
+    """
+    One transaction: close the game, compact its moves, credit both players.
+    Returns the (user_id, username, delta) rows credited.
+    """
+    game_id = game.game_id
+    moves_uci = game.moves_uci()
+    scored = []
     async with AsyncSessionLocal() as db:
-        # Update game in database
-        db_game_result = await db.execute(select(Game).where(Game.id == game_id))
-        db_game = db_game_result.scalar_one_or_none()
-        
-        if db_game:
-            db_game.status = "completed"
-            db_game.result = result
-            db_game.completed_at = datetime.now(timezone.utc)
-            db_game.pgn = game.get_pgn()
-            
-            # Determine winner
-            if result == "white_wins":
-                db_game.winner_id = db_game.white_player_id
-            elif result == "black_wins" and db_game.black_player_id:
-                db_game.winner_id = db_game.black_player_id
+        async with db.begin():
+            closed = await db.execute(
+                update(Game)
+                .where(Game.id == game_id, Game.status == "active")
+                .values(
+                    status="abandoned" if reason == "abandoned" else "completed",
+                    result=result,
+                    winner_id=winner_id,
+                    completed_at=datetime.now(timezone.utc),
+                    pgn=game.get_pgn(result)
+                )
+                .execution_options(synchronize_session=False)
+            )
             
-            await db.commit()
-        
-        # Update points
+            # Only settle once, even if the game is ended twice
+            if closed.rowcount == 1:
+                # Replace the per-ply rows with the compact move log
+                db.add(GameLog(
+                    game_id=game_id,
+                    moves=move_log.pack_moves(moves_uci),
+                    keyframes=move_log.build_keyframes(moves_uci),
+                    ply_count=len(moves_uci)
+                ))
+                await db.execute(delete(GameMove).where(GameMove.game_id == game_id))
+                
+                # Atomic increments, so concurrent settlements never lose points
+                if deltas:
+                    rows = await db.execute(
+                        update(User)
+                        .where(User.id.in_(deltas))
+                        .values(points=User.points + case(deltas, value=User.id, else_=0))
+                        .returning(User.id, User.username)
+                        .execution_options(synchronize_session=False)
+                    )
+                    scored = [(user_id, username, deltas[user_id]) for user_id, username in rows.all()]
+    return scored
+
+
+async def handle_game_end(game_id: int, result: str, reason: Optional[str] = None):
+    """Handle end of game - update database and points"""
+    
+    game = await get_game(game_id)
+    if not game:
+        return
+    
+    # Only the worker that removes the game from the shared store settles it
+    if not await remove_game(game_id):
+        return
+    timer_wheel.cancel(("flag", game_id))
+    timer_wheel.cancel(("abandon", game_id))
+    
+    white_points = settings.WIN_POINTS if result == "white_wins" else (settings.DRAW_POINTS if result == "draw" else 0)
+    black_points = settings.WIN_POINTS if result == "black_wins" else (settings.DRAW_POINTS if result == "draw" else 0)
+    deltas = {game.white_player_id: white_points}
+    if game.black_player_id:
+        deltas[game.black_player_id] = black_points
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    
+    if result == "white_wins":
+        winner_id = game.white_player_id
+    elif result == "black_wins":
+        winner_id = game.black_player_id
+    else:
+        winner_id = None
+    
+    try:
+        scored = await _settle(game, result, reason, winner_id, deltas)
+    except Exception as e:
+        # Nothing was settled: put the game back so it can still be finished
+        print(f"Settlement failed for game {game_id}: {e}")
+        await reinstate_game(game)
+        schedule_flag_check(game)
+        return
+    
+    # The settled move log supersedes any of its moves still buffered here,
+    # so settlement never waits on (or fails with) the move writer
+    move_writer.discard(game_id)
+    
+    # Cached principals now hold stale points
+    principal_cache.invalidate(*deltas)
+    
+    # All leaderboard increments in one pipeline
+    if scored:
         redis_client = await get_redis()
-        
-        # Get players
-        white_result = await db.execute(select(User).where(User.id == game.white_player_id))
-        white_player = white_result.scalar_one_or_none()
-        
-        if white_player:
-            if result == "white_wins":
-                white_player.points += settings.WIN_POINTS
-                await update_points(redis_client, white_player.id, white_player.username, settings.WIN_POINTS)
-            elif result == "draw":
-                white_player.points += settings.DRAW_POINTS
-                await update_points(redis_client, white_player.id, white_player.username, settings.DRAW_POINTS)
-        
-        if game.black_player_id:
-            black_result = await db.execute(select(User).where(User.id == game.black_player_id))
-            black_player = black_result.scalar_one_or_none()
-            
-            if black_player:
-                if result == "black_wins":
-                    black_player.points += settings.WIN_POINTS
-                    await update_points(redis_client, black_player.id, black_player.username, settings.WIN_POINTS)
-                elif result == "draw":
-                    black_player.points += settings.DRAW_POINTS
-                    await update_points(redis_client, black_player.id, black_player.username, settings.DRAW_POINTS)
-        
-        await db.commit()
+        await update_points_many(redis_client, scored)
     
     # Broadcast game over
     await manager.send_to_game(game_id, {
         "type": "game_over",
         "result": result,
-        "white_points": settings.WIN_POINTS if result == "white_wins" else (settings.DRAW_POINTS if result == "draw" else 0),
-        "black_points": settings.WIN_POINTS if result == "black_wins" else (settings.DRAW_POINTS if result == "draw" else 0)
+        "reason": reason,
+        "white_points": white_points,
+        "black_points": black_points
     })
-    
-    # Remove from active games
-    remove_game(game_id)
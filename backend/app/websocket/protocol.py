@@ -0,0 +1,126 @@
+import struct
+from typing import Optional
+
+import chess
+from fastapi import WebSocket
+
+from app.services.move_log import encode_move, decode_move
+
+# Clients opt in with "Sec-WebSocket-Protocol: chess.bin.v1"; JSON text stays the default.
+BINARY_SUBPROTOCOL = "chess.bin.v1"
+
+# Frame types (first byte). Anything without a binary layout is sent as a JSON text frame.
+MOVE = 0x01
+STATE = 0x02
+GAME_OVER = 0x03
+RESIGN = 0x04
+GET_STATE = 0x05
+
+# "abandoned" (nobody connected) only ever ends a game through GAME_OVER
+RESULT_CODES = {None: 0, "white_wins": 1, "black_wins": 2, "draw": 3, "abandoned": 4}
+RESULTS = {code: result for result, code in RESULT_CODES.items()}
+REASON_CODES = {None: 0, "resignation": 1, "timeout": 2, "abandoned": 3}
+
+# Every server frame has the event sequence number (u32) after its flags/result byte.
+
+# MOVE (server -> client): type, flags, seq, ply, move, SAN (NUL padded); then CLOCK if flagged
+#   flags: bit0 game over, bit1 black to move, bits 2-3 result code, bit4 has clock
+MOVE_FRAME = struct.Struct("<BBIHH8s")
+# STATE header: type, flags, seq, ply, FEN length; then FEN, legal move count (u8),
+# packed moves (u16 each), then CLOCK if flagged
+#   flags: bit0 black to move, bit1 has colour, bit2 colour is black, bit3 bot game,
+#          bit4 game over, bits 5-6 result code, bit7 has clock
+STATE_HEADER = struct.Struct("<BBIHB")
+# CLOCK: white ms, black ms (remaining as of turn start), turn start (epoch ms), running
+CLOCK = struct.Struct("<IIQB")
+# GAME_OVER: type, result code, seq, white points, black points, reason code
+GAME_OVER_FRAME = struct.Struct("<BBIhhB")
+# MOVE (client -> server): type, move
+CLIENT_MOVE_FRAME = struct.Struct("<BH")
+
+
+def select_subprotocol(websocket: WebSocket) -> Optional[str]:
+    """The subprotocol to accept, if the client offered one we speak"""
+    if BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", []):
+        return BINARY_SUBPROTOCOL
+    return None
+
+
+def event_seq(text: str) -> Optional[int]:
+    """Sequence number of a serialized game event (spliced in first when it was published)"""
+    if not text.startswith('{"seq":'):
+        return None
+    return int(text[7:text.index(",", 7)])
+
+
+def _clock(clock: Optional[dict]) -> bytes:
+    if not clock:
+        return b""
+    return CLOCK.pack(clock["white_ms"], clock["black_ms"], clock["turn_started_ms"], bool(clock["running"]))
+
+
+def encode(message: dict) -> Optional[bytes]:
+    """Binary frame for a server message, or None to send it as JSON"""
+    msg_type = message.get("type")
+    result_code = RESULT_CODES.get(message.get("result"), 0)
+    clock = message.get("clock")
+
+    if msg_type == "move":
+        flags = (
+            bool(message.get("is_game_over"))
+            | (message.get("turn") == "black") << 1
+            | (result_code & 0x3) << 2
+            | bool(clock) << 4
+        )
+        return MOVE_FRAME.pack(
+            MOVE, flags, message.get("seq", 0), message.get("ply", 0),
+            encode_move(chess.Move.from_uci(message["move_uci"])),
+            message["move_san"].encode("ascii"),
+        ) + _clock(clock)
+
+    if msg_type == "game_state":
+        color = message.get("your_color")
+        flags = (
+            (message.get("turn") == "black")
+            | (color is not None) << 1
+            | (color == "black") << 2
+            | bool(message.get("is_bot_game")) << 3
+            | bool(message.get("is_game_over")) << 4
+            | (result_code & 0x3) << 5
+            | bool(clock) << 7
+        )
+        fen = message["fen"].encode("ascii")
+        legal = [encode_move(chess.Move.from_uci(uci)) for uci in message.get("legal_moves", [])]
+        return b"".join((
+            STATE_HEADER.pack(STATE, flags, message.get("seq", 0), message.get("ply", 0), len(fen)),
+            fen,
+            struct.pack(f"<B{len(legal)}H", len(legal), *legal),
+            _clock(clock),
+        ))
+
+    if msg_type == "game_over":
+        return GAME_OVER_FRAME.pack(
+            GAME_OVER, result_code, message.get("seq", 0),
+            message.get("white_points", 0), message.get("black_points", 0),
+            REASON_CODES.get(message.get("reason"), 0),
+        )
+
+    return None
+
+
+def decode(data: bytes) -> dict:
+    """Client frame to the same dict a JSON client would send"""
+    if not data:
+        return {}
+    if data[0] == MOVE and len(data) == CLIENT_MOVE_FRAME.size:
+        _, code = CLIENT_MOVE_FRAME.unpack(data)
+        try:
+            return {"type": "move", "move": decode_move(code).uci()}
+        except IndexError:
+            # Promotion bits out of range: the null move, which is always rejected as illegal
+            return {"type": "move", "move": "0000"}
+    if data[0] == RESIGN:
+        return {"type": "resign"}
+    if data[0] == GET_STATE:
+        return {"type": "get_state"}
+    return {}
@@ -0,0 +1,359 @@
+import json
+import uuid
+import asyncio
+from collections import deque
+from typing import Optional
+from fastapi import WebSocket
+
+from app.config import get_settings
+from app.services import get_game
+from app.websocket import protocol
+
+settings = get_settings()
+
+# Viewer counts per game: a hash of worker id -> that worker's viewers, so
+# the cluster-wide total is the sum over workers that are still alive
+SPECTATORS_KEY = "chess:spectators:"
+# Liveness of a worker's counts, refreshed by its heartbeat
+SPECTATOR_WORKER_KEY = "chess:spectators:worker:"
+
+# Sum the live workers' counts for KEYS[1], dropping the fields of workers
+# whose heartbeat key (ARGV[1] prefix) has expired. ARGV[2] is the caller.
+_LIVE_TOTAL = """
+local total = 0
+local counts = redis.call('HGETALL', KEYS[1])
+for i = 1, #counts, 2 do
+    local worker = counts[i]
+    if worker ~= ARGV[2] and redis.call('EXISTS', ARGV[1] .. worker) == 0 then
+        redis.call('HDEL', KEYS[1], worker)
+    else
+        total = total + tonumber(counts[i + 1])
+    end
+end
+"""
+
+# Count a viewer for worker ARGV[2] unless the game already has ARGV[3];
+# the key's TTL (ARGV[4]) is refreshed only for accepted viewers.
+# Returns the new total, or -1 when at capacity.
+JOIN_SCRIPT = _LIVE_TOTAL + """
+if total >= tonumber(ARGV[3]) then
+    return -1
+end
+redis.call('HINCRBY', KEYS[1], ARGV[2], 1)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return total + 1
+"""
+
+# Uncount a viewer of worker ARGV[1], dropping its field at zero
+RELEASE_SCRIPT = """
+if redis.call('HINCRBY', KEYS[1], ARGV[1], -1) <= 0 then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+end
+"""
+
+COUNT_SCRIPT = _LIVE_TOTAL + """
+return total
+"""
+
+
+class Viewer:
+    """A spectator socket with a small frame buffer and its own writer task"""
+    __slots__ = ("websocket", "channel", "frames", "wakeup", "behind", "last_seq", "task")
+
+    def __init__(self, websocket: WebSocket, channel: "SpectatorChannel"):
+        self.websocket = websocket
+        self.channel = channel
+        self.frames: deque[tuple[Optional[int], str]] = deque()
+        self.wakeup = asyncio.Event()
+        # Starts behind, so the first thing a viewer gets is a snapshot
+        self.behind = True
+        self.wakeup.set()
+        self.last_seq = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def push(self, seq: Optional[int], text: str):
+        if self.behind:
+            return
+        if len(self.frames) >= settings.SPECTATOR_BUFFER_SIZE:
+            # Fell behind: skip the backlog and catch up from the latest state
+            self.frames.clear()
+            self.behind = True
+            self.channel.coalesced += 1
+        else:
+            self.frames.append((seq, text))
+        self.wakeup.set()
+
+    async def run(self):
+        try:
+            await self.channel.loaded
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                if self.behind:
+                    self.behind = False
+                    self.last_seq, text = self.channel.snapshot()
+                    await self._send(text)
+                while self.frames and not self.behind:
+                    seq, text = self.frames.popleft()
+                    if seq is not None:
+                        if seq <= self.last_seq:
+                            # Already part of the snapshot
+                            continue
+                        self.last_seq = seq
+                    await self._send(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Dead or stalled socket
+            spectator_hub.leave(self)
+
+    async def _send(self, text: str):
+        await asyncio.wait_for(self.websocket.send_text(text), timeout=settings.WS_SEND_TIMEOUT_SECONDS)
+
+
+class SpectatorChannel:
+    """
+    Fan-out for one game on this worker.
+
+    Publishing only appends to a pending queue; a single task copies each
+    frame to the viewers' buffers, yielding between batches, so player
+    traffic never waits on the number of spectators.
+
+    The game's state is loaded once per channel and then kept current from
+    the published events, so snapshots for new or lagging viewers cost no
+    lookups; each snapshot carries the seq of the last event it includes.
+    """
+
+    def __init__(self, game_id: int):
+        self.game_id = game_id
+        self.viewers: set[Viewer] = set()
+        self.pending: deque[tuple[Optional[int], str]] = deque()
+        self.ready = asyncio.Event()
+        self.coalesced = 0
+        self.seq = 0
+        self.loaded: Optional[asyncio.Future] = None
+        self._state: Optional[dict] = None
+        self._early: list[tuple[int, str]] = []  # Events published while loading
+        self._text: Optional[str] = None
+        self._task = asyncio.create_task(self._fanout())
+
+    async def load(self, seq: int):
+        """Initial state, read after the sequence number so it is at least that recent"""
+        game = await get_game(self.game_id)
+        self.seq = seq
+        if game is None:
+            # Already finished: its final event arrives (or has arrived) as game_over
+            self._state = {"type": "game_over", "game_id": self.game_id}
+        else:
+            self._state = {
+                "type": "game_state",
+                "game_id": self.game_id,
+                "fen": game.get_fen(),
+                "turn": game.get_current_turn(),
+                "ply": game.ply,
+                "last_move": game.last_move_uci(),
+                "clock": game.get_clock(),
+                "is_game_over": game.is_game_over(),
+                "result": game.get_result(),
+                "is_bot_game": game.is_bot_game,
+                "spectating": True
+            }
+        early, self._early = self._early, []
+        for event_seq, text in early:
+            self._apply(event_seq, text)
+
+    def publish(self, text: str):
+        seq = protocol.event_seq(text)
+        self.pending.append((seq, text))
+        if seq is not None:
+            self._apply(seq, text)
+        self.ready.set()
+
+    def _apply(self, seq: int, text: str):
+        if self._state is None:
+            self._early.append((seq, text))
+            return
+        if seq <= self.seq:
+            return
+        self.seq = seq
+        self._text = None
+        event = json.loads(text)
+        if event.get("type") == "move" and self._state["type"] == "game_state":
+            self._state.update(
+                fen=event["fen"],
+                turn=event["turn"],
+                ply=event["ply"],
+                last_move=event["move_uci"],
+                clock=event.get("clock"),
+                is_game_over=event["is_game_over"],
+                result=event.get("result")
+            )
+        elif event.get("type") == "game_over":
+            self._state.update(is_game_over=True, result=event.get("result"), reason=event.get("reason"))
+
+    def snapshot(self) -> tuple[int, str]:
+        """(seq, current state), serialized once per event and shared by every lagging viewer"""
+        if self._text is None:
+            self._text = json.dumps({**self._state, "seq": self.seq})
+        return self.seq, self._text
+
+    async def _fanout(self):
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while self.pending:
+                seq, text = self.pending.popleft()
+                for i, viewer in enumerate(list(self.viewers), start=1):
+                    viewer.push(seq, text)
+                    if i % settings.SPECTATOR_FANOUT_BATCH == 0:
+                        await asyncio.sleep(0)
+
+    def close(self):
+        self._task.cancel()
+        if self.loaded is not None:
+            self.loaded.cancel()
+
+
+class SpectatorHub:
+    """
+    Spectator channels on this worker, with a cluster-wide cap per game.
+
+    Each worker counts its own viewers under its id and keeps a short-lived
+    heartbeat key alive; a crashed worker's viewers stop counting once its
+    heartbeat expires instead of holding the game at capacity.
+    """
+
+    def __init__(self):
+        self.channels: dict[int, SpectatorChannel] = {}
+        self.rejected = 0
+        self.worker_id = uuid.uuid4().hex
+        # The connection manager (set by game_ws, which imports this module):
+        # subscribes this worker to a game's events and knows its current seq
+        self.events = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        # Count releases in flight; the event loop only keeps weak references to tasks
+        self._releasing: set[asyncio.Task] = set()
+        self._join_script = None
+        self._release_script = None
+        self._count_script = None
+
+    async def start(self, redis_client):
+        self._join_script = redis_client.register_script(JOIN_SCRIPT)
+        self._release_script = redis_client.register_script(RELEASE_SCRIPT)
+        self._count_script = redis_client.register_script(COUNT_SCRIPT)
+        await self._beat(redis_client)
+        self._heartbeat_task = asyncio.create_task(self._heartbeat(redis_client))
+
+    async def stop(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+        await asyncio.gather(*self._releasing, return_exceptions=True)
+
+    async def _beat(self, redis_client):
+        await redis_client.set(
+            f"{SPECTATOR_WORKER_KEY}{self.worker_id}", 1,
+            ex=max(1, int(settings.SPECTATOR_HEARTBEAT_SECONDS * 3))
+        )
+
+    async def _heartbeat(self, redis_client):
+        while True:
+            await asyncio.sleep(settings.SPECTATOR_HEARTBEAT_SECONDS)
+            try:
+                await self._beat(redis_client)
+            except Exception as e:
+                print(f"Spectator heartbeat error: {e}")
+
+    async def join(self, websocket: WebSocket, game_id: int) -> Optional[Viewer]:
+        """Accept a viewer, or return None when the game is at capacity"""
+        count = await self._join_script(
+            keys=[f"{SPECTATORS_KEY}{game_id}"],
+            args=[SPECTATOR_WORKER_KEY, self.worker_id, settings.SPECTATOR_MAX_PER_GAME, settings.GAME_STATE_TTL_SECONDS]
+        )
+        if count < 0:
+            self.rejected += 1
+            return None
+
+        channel = self.channels.get(game_id)
+        if channel is None:
+            channel = self.channels[game_id] = SpectatorChannel(game_id)
+        viewer = Viewer(websocket, channel)
+        channel.viewers.add(viewer)
+        if channel.loaded is None:
+            channel.loaded = asyncio.create_task(self._load(channel))
+        viewer.task = asyncio.create_task(viewer.run())
+        return viewer
+
+    async def _load(self, channel: SpectatorChannel):
+        seq = 0
+        if self.events is not None:
+            # Subscribed first, so every event after the state read reaches the channel
+            await self.events.watch(channel.game_id)
+            seq = await self.events.current_seq(channel.game_id)
+        await channel.load(seq)
+
+    def leave(self, viewer: Viewer):
+        channel = viewer.channel
+        if viewer not in channel.viewers:
+            return
+        channel.viewers.discard(viewer)
+        if viewer.task is not None and viewer.task is not asyncio.current_task():
+            viewer.task.cancel()
+        if not channel.viewers and self.channels.get(channel.game_id) is channel:
+            channel.close()
+            del self.channels[channel.game_id]
+        task = asyncio.create_task(self._release(channel.game_id))
+        self._releasing.add(task)
+        task.add_done_callback(self._releasing.discard)
+
+    async def _release(self, game_id: int):
+        try:
+            await self._release_script(keys=[f"{SPECTATORS_KEY}{game_id}"], args=[self.worker_id])
+        except Exception as e:
+            print(f"Spectator count release failed for game {game_id}: {e}")
+
+    def publish(self, game_id: int, text: str):
+        """Hand a serialized game event to this worker's viewers (O(1) for the caller)"""
+        channel = self.channels.get(game_id)
+        if channel is not None:
+            channel.publish(text)
+
+    async def count(self, game_id: int) -> int:
+        return int(await self._count_script(
+            keys=[f"{SPECTATORS_KEY}{game_id}"], args=[SPECTATOR_WORKER_KEY, self.worker_id]
+        ))
+
+    def stats(self) -> dict:
+        return {
+            "games": len(self.channels),
+            "viewers": sum(len(c.viewers) for c in self.channels.values()),
+            "coalesced": sum(c.coalesced for c in self.channels.values()),
+            "rejected": self.rejected
+        }
+
+
+spectator_hub = SpectatorHub()
+
+
+async def handle_spectator_websocket(websocket: WebSocket, game_id: int):
+    """Read-only stream of a game's public events"""
+
+    if not await get_game(game_id):
+        await websocket.close(code=4004, reason="Game not found")
+        return
+
+    await websocket.accept()
+    viewer = await spectator_hub.join(websocket, game_id)
+    if viewer is None:
+        await websocket.close(code=1013, reason="Spectator limit reached")
+        return
+
+    try:
+        # Spectators don't send anything; this just waits for the disconnect
+        while True:
+            await websocket.receive_text()
+    except Exception:
+        pass
+    finally:
+        spectator_hub.leave(viewer)
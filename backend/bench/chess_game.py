@@ -0,0 +1,136 @@
+"""
+Per-move CPU cost of ChessGame, before and after per-ply memoization.
+
+Replays the same random games through the original ChessGame (reproduced
+below as BaselineGame) and the current one, doing per ply what the WebSocket
+handlers do: check the turn, make the move, then build the broadcast and the
+next player's state (FEN, turn, legal moves, game over).
+
+    uv run python -m bench.chess_game --games 200 --plies 120
+"""
+import argparse
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import chess
+
+from app.services.chess_game import ChessGame
+
+
+@dataclass
+class BaselineGame:
+    """ChessGame before memoization (move handling only)"""
+    game_id: int
+    white_player_id: int
+    black_player_id: Optional[int]
+    board: chess.Board = field(default_factory=chess.Board)
+    move_history: list = field(default_factory=list)
+
+    def make_move(self, move_uci: str) -> dict:
+        try:
+            move = chess.Move.from_uci(move_uci)
+            if move not in self.board.legal_moves:
+                return {"success": False, "error": "Illegal move"}
+            move_san = self.board.san(move)
+            self.board.push(move)
+            self.move_history.append({
+                "move_number": len(self.move_history) + 1,
+                "move_san": move_san,
+                "move_uci": move_uci,
+                "fen_after": self.board.fen()
+            })
+            return {
+                "success": True,
+                "move_san": move_san,
+                "move_uci": move_uci,
+                "fen": self.board.fen(),
+                "is_game_over": self.is_game_over(),
+                "result": self.get_result() if self.is_game_over() else None
+            }
+        except ValueError as e:
+            return {"success": False, "error": f"Invalid move format: {str(e)}"}
+
+    def is_game_over(self) -> bool:
+        return self.board.is_game_over()
+
+    def get_result(self) -> Optional[str]:
+        if not self.is_game_over():
+            return None
+        if self.board.is_checkmate():
+            return "black_wins" if self.board.turn == chess.WHITE else "white_wins"
+        elif self.board.is_stalemate():
+            return "draw"
+        elif self.board.is_insufficient_material():
+            return "draw"
+        elif self.board.is_fifty_moves():
+            return "draw"
+        elif self.board.is_repetition():
+            return "draw"
+        return "draw"
+
+    def get_current_turn(self) -> str:
+        return "white" if self.board.turn == chess.WHITE else "black"
+
+    def get_legal_moves(self) -> list[str]:
+        return [move.uci() for move in self.board.legal_moves]
+
+    def get_fen(self) -> str:
+        return self.board.fen()
+
+
+def random_games(count: int, max_plies: int, seed: int) -> list[list[str]]:
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        board = chess.Board()
+        moves = []
+        while len(moves) < max_plies and not board.is_game_over():
+            move = rng.choice(list(board.legal_moves))
+            board.push(move)
+            moves.append(move.uci())
+        games.append(moves)
+    return games
+
+
+def play(cls, games: list[list[str]]) -> float:
+    """Seconds to play every game, with the per-ply work of the handlers"""
+    start = time.perf_counter()
+    for game_id, moves in enumerate(games):
+        game = cls(game_id=game_id, white_player_id=1, black_player_id=2)
+        for uci in moves:
+            game.get_current_turn()
+            result = game.make_move(uci)
+            assert result["success"], result
+            # Move broadcast, then the state sent to the player to move
+            game.get_current_turn()
+            game.get_fen()
+            game.get_current_turn()
+            game.get_legal_moves()
+            game.is_game_over()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--plies", type=int, default=120, help="Maximum plies per game")
+    parser.add_argument("--repeat", type=int, default=5, help="Best of this many runs")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    games = random_games(args.games, args.plies, args.seed)
+    plies = sum(len(moves) for moves in games)
+    print(f"{args.games} games, {plies} plies")
+
+    results = {}
+    for name, cls in (("before", BaselineGame), ("after", ChessGame)):
+        best = min(play(cls, games) for _ in range(args.repeat))
+        results[name] = best
+        print(f"{name:>6}: {best / plies * 1e6:8.1f} us/move")
+    print(f"speedup: {results['before'] / results['after']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
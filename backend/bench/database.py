@@ -0,0 +1,137 @@
+"""
+Database profile benchmark: move-write throughput with concurrent read latency.
+
+Each configuration runs in its own process against a fresh SQLite file:
+  --games tasks write one move every --move-interval seconds each, either
+  through the write-behind MoveWriter ("batched") or with one commit per
+  move ("per-move"), while --readers tasks keep reading a random game's
+  moves on the read engine. Reports committed moves/s and read latency.
+
+    uv run python -m bench.database --journal-modes WAL DELETE --write-modes batched per-move
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+async def run(args) -> dict:
+    # Imported here: the settings are read from the environment set by main()
+    from sqlalchemy import insert, select
+    from app.database import AsyncSessionLocal, ReadSessionLocal, init_db, close_db
+    from app.models import User, Game, GameMove
+    from app.services.move_writer import move_writer
+
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        user = User(username="bench", email="bench@example.com", password_hash="-", points=0)
+        db.add(user)
+        await db.flush()
+        result = await db.execute(
+            insert(Game).returning(Game.id),
+            [{"white_player_id": user.id, "status": "active"} for _ in range(args.games)]
+        )
+        game_ids = list(result.scalars())
+        await db.commit()
+
+    stop = time.perf_counter() + args.seconds
+    committed = 0
+    latencies: list[float] = []
+
+    async def writer(game_id: int):
+        nonlocal committed
+        ply = 0
+        while time.perf_counter() < stop:
+            ply += 1
+            row = {
+                "game_id": game_id, "move_number": ply, "move_san": "Nf3", "move_uci": "g1f3",
+                "fen_after": "rnbqkbnr/pppppppp/8/8/8/5N2/PPPPPPPP/RNBQKB1R b KQkq - 1 1",
+            }
+            if args.write_mode == "batched":
+                move_writer.add(**row)
+            else:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(insert(GameMove), [row])
+                    await db.commit()
+                committed += 1
+            await asyncio.sleep(args.move_interval)
+
+    async def reader():
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            async with ReadSessionLocal() as db:
+                result = await db.execute(
+                    select(GameMove.move_san, GameMove.move_uci, GameMove.fen_after)
+                    .where(GameMove.game_id == random.choice(game_ids))
+                    .order_by(GameMove.move_number)
+                )
+                result.all()
+            latencies.append(time.perf_counter() - started)
+
+    if args.write_mode == "batched":
+        await move_writer.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(game_id) for game_id in game_ids), *(reader() for _ in range(args.readers)))
+    if args.write_mode == "batched":
+        await move_writer.stop()
+        committed = move_writer.rows_written
+    elapsed = time.perf_counter() - started
+    await close_db()
+
+    latencies.sort()
+    return {
+        "journal_mode": args.journal_mode,
+        "write_mode": args.write_mode,
+        "moves_per_s": round(committed / elapsed),
+        "reads": len(latencies),
+        "read_p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "read_p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--journal-modes", nargs="+", default=["WAL", "DELETE"])
+    parser.add_argument("--write-modes", nargs="+", default=["batched", "per-move"], choices=["batched", "per-move"])
+    parser.add_argument("--games", type=int, default=200, help="Concurrent games writing moves")
+    parser.add_argument("--move-interval", type=float, default=0.05, help="Seconds between moves in each game")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    # Internal: run one configuration in this process
+    parser.add_argument("--journal-mode", help=argparse.SUPPRESS)
+    parser.add_argument("--write-mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.journal_mode:
+        print(json.dumps(asyncio.run(run(args))))
+        return
+
+    common = [
+        "--games", str(args.games), "--move-interval", str(args.move_interval),
+        "--readers", str(args.readers), "--seconds", str(args.seconds),
+    ]
+    for journal_mode in args.journal_modes:
+        for write_mode in args.write_modes:
+            with tempfile.TemporaryDirectory() as tmp:
+                env = dict(
+                    os.environ,
+                    DATABASE_URL=f"sqlite+aiosqlite:///{tmp}/bench.db",
+                    DATABASE_READ_URL="",
+                    SQLITE_JOURNAL_MODE=journal_mode,
+                )
+                output = subprocess.run(
+                    [sys.executable, "-m", "bench.database", *common,
+                     "--journal-mode", journal_mode, "--write-mode", write_mode],
+                    env=env, capture_output=True, text=True, check=True,
+                ).stdout
+            print(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
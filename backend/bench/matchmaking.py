@@ -0,0 +1,123 @@
+"""
+Matchmaking benchmark: Redis ops/s and time-to-match with many queued players.
+
+Runs the real MatchmakingEngine against a Redis server. Two scenarios per size:
+
+  pairing  N players join at once with ratings close enough to pair; reports
+           time-to-match percentiles and Redis commands per second / per match.
+  idle     N players wait with ratings too far apart to ever pair; reports the
+           Redis commands per second the waiting queue costs.
+
+Uses (and flushes) a separate Redis database, 15 by default:
+
+    uv run python -m bench.matchmaking --players 1000 10000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import redis.asyncio as redis
+
+from app.config import get_settings
+from app.services.matchmaking import MatchmakingEngine, MatchmakingService
+
+settings = get_settings()
+
+
+async def commands_processed(client: redis.Redis) -> int:
+    return int((await client.info("stats"))["total_commands_processed"])
+
+
+async def pairing(client: redis.Redis, players: int, timeout: float) -> dict:
+    engine = MatchmakingEngine()
+    await engine.start(client)
+    service = MatchmakingService(client, engine)
+    service.timeout = timeout
+    waits: list[float] = []
+    bots = 0
+
+    async def player(user_id: int):
+        nonlocal bots
+        started = time.perf_counter()
+        match = await service.find_match(user_id, f"bench{user_id}", int(random.gauss(1000, 150)))
+        if match["status"] == "bot_game":
+            bots += 1
+            return
+        if match["color"] == "white":
+            # What the game router does once white has created the game
+            await service.notify_opponent(match["other_entry_id"], user_id, user_id, f"bench{user_id}")
+        waits.append(time.perf_counter() - started)
+
+    await asyncio.sleep(0.2)  # Let the listener subscribe
+    before = await commands_processed(client)
+    started = time.perf_counter()
+    await asyncio.gather(*(player(i) for i in range(1, players + 1)))
+    elapsed = time.perf_counter() - started
+    ops = await commands_processed(client) - before
+    await engine.stop()
+
+    waits.sort()
+    matched = len(waits)
+    return {
+        "matched": matched,
+        "bot_games": bots,
+        "elapsed_s": round(elapsed, 3),
+        "ops_per_s": round(ops / elapsed),
+        "ops_per_match": round(ops / max(matched, 1), 1),
+        "p50_ms": round(statistics.median(waits) * 1000, 1) if waits else None,
+        "p99_ms": round(waits[int(matched * 0.99) - 1] * 1000, 1) if waits else None,
+        "max_ms": round(waits[-1] * 1000, 1) if waits else None,
+    }
+
+
+async def idle(client: redis.Redis, players: int, seconds: float) -> dict:
+    engine = MatchmakingEngine()
+    await engine.start(client)
+    service = MatchmakingService(client, engine)
+    # Further apart than the widest window, so nobody pairs
+    spacing = settings.MATCHMAKING_WINDOW_MAX * 2 + 1
+    for start in range(0, players, 1000):
+        await asyncio.gather(*(
+            service.join_queue(i, f"bench{i}", i * spacing)
+            for i in range(start, min(start + 1000, players))
+        ))
+    await asyncio.sleep(settings.MATCHMAKING_TICK_SECONDS)  # Let the enqueue sweeps settle
+
+    before = await commands_processed(client)
+    await asyncio.sleep(seconds)
+    ops = await commands_processed(client) - before
+    await engine.stop()
+    return {"waiting": await service.get_queue_size(), "ops_per_s": round(ops / seconds, 1)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--db", type=int, default=15, help="Redis database to use (flushed)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-player matchmaking timeout")
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    client = redis.Redis(connection_pool=redis.BlockingConnectionPool(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        password=settings.REDIS_PASSWORD or None,
+        db=args.db,
+        decode_responses=True,
+        max_connections=64,
+    ))
+    try:
+        for players in args.players:
+            await client.flushdb()
+            print(f"pairing {players:>6}: {await pairing(client, players, args.timeout)}")
+            await client.flushdb()
+            print(f"idle    {players:>6}: {await idle(client, players, args.idle_seconds)}")
+        await client.flushdb()
+    finally:
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
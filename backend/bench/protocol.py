@@ -0,0 +1,70 @@
+"""
+Binary WebSocket protocol vs JSON: frame sizes and encode cost.
+
+Builds the server messages the game handlers send (move broadcasts, the
+initial game_state with legal moves, game_over) for positions taken from a
+seeded random game, and times json.dumps against protocol.encode.
+
+    uv run python -m bench.protocol
+"""
+import argparse
+import json
+import random
+import timeit
+
+from app.services.chess_game import ChessGame
+from app.websocket import protocol
+
+
+def sample_messages(plies: int, seed: int) -> dict[str, list[dict]]:
+    rng = random.Random(seed)
+    # A timed game, so the messages carry the clock exactly as get_clock() builds it
+    game = ChessGame(game_id=1, white_player_id=1, black_player_id=2, base_ms=600_000, increment_ms=5_000)
+    turn_started_ms = 1_700_000_000_000
+    messages: dict[str, list[dict]] = {"move": [], "game_state": [], "game_over": []}
+    seq = 0
+    while game.ply < plies and not game.is_game_over():
+        result = game.make_move(rng.choice(game.get_legal_moves()))
+        turn_started_ms += 3_000
+        game.set_clock(600_000 - game.ply * 1_000, 600_000 - game.ply * 1_200, turn_started_ms)
+        seq += 1
+        turn = game.get_current_turn()
+        messages["move"].append({
+            "seq": seq, "type": "move", "ply": game.ply, "move_san": result["move_san"],
+            "move_uci": result["move_uci"], "fen": result["fen"], "turn": turn, "clock": game.get_clock(),
+            "is_game_over": result["is_game_over"], "result": result["result"],
+        })
+        messages["game_state"].append({
+            "type": "game_state", "game_id": 1, "seq": seq, "fen": game.get_fen(), "ply": game.ply,
+            "turn": turn, "your_color": turn, "legal_moves": game.get_legal_moves(),
+            "clock": game.get_clock(), "is_bot_game": False,
+        })
+    messages["game_over"].append({
+        "seq": seq + 1, "type": "game_over", "result": "white_wins", "reason": "resignation",
+        "white_points": 10, "black_points": 0,
+    })
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plies", type=int, default=80)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--number", type=int, default=20, help="Timing loops over each message set")
+    args = parser.parse_args()
+
+    print(f"{'message':<12}{'json B':>9}{'binary B':>10}{'ratio':>8}{'json us':>10}{'binary us':>11}")
+    for kind, messages in sample_messages(args.plies, args.seed).items():
+        json_size = sum(len(json.dumps(m).encode()) for m in messages) / len(messages)
+        binary_size = sum(len(protocol.encode(m)) for m in messages) / len(messages)
+        count = args.number * len(messages)
+        json_us = timeit.timeit(lambda: [json.dumps(m) for m in messages], number=args.number) / count * 1e6
+        binary_us = timeit.timeit(lambda: [protocol.encode(m) for m in messages], number=args.number) / count * 1e6
+        print(
+            f"{kind:<12}{json_size:>9.1f}{binary_size:>10.1f}{json_size / binary_size:>7.1f}x"
+            f"{json_us:>10.2f}{binary_us:>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
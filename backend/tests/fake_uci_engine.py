@@ -0,0 +1,42 @@
+"""
+Minimal stand-in UCI engine for tests: answers `go` with the first legal move.
+
+Usage: fake_uci_engine.py [ok | hang | crash | crash-once MARKER]
+  hang        never answers `go`
+  crash       exits on `go`
+  crash-once  exits on `go` unless MARKER exists, creating it first
+"""
+import os
+import sys
+
+import chess
+
+
+def main():
+    mode = sys.argv[1] if len(sys.argv) > 1 else "ok"
+    board = chess.Board()
+    for line in sys.stdin:
+        command, _, args = line.strip().partition(" ")
+        if command == "uci":
+            print("id name FakeEngine\nuciok", flush=True)
+        elif command == "isready":
+            print("readyok", flush=True)
+        elif command == "position":
+            fen, _, moves = args.removeprefix("fen ").partition(" moves ")
+            board = chess.Board() if fen == "startpos" else chess.Board(fen)
+            for move in moves.split():
+                board.push_uci(move)
+        elif command == "go":
+            if mode == "hang":
+                continue
+            if mode == "crash" or (mode == "crash-once" and not os.path.exists(sys.argv[2])):
+                if mode == "crash-once":
+                    open(sys.argv[2], "w").close()
+                sys.exit(1)
+            print(f"bestmove {next(iter(board.legal_moves)).uci()}", flush=True)
+        elif command == "quit":
+            return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import chess
+import chess.engine
+import pytest
+
+from app.services.stockfish import EnginePool, EnginePoolBusy
+
+FAKE_ENGINE = str(Path(__file__).with_name("fake_uci_engine.py"))
+
+
+def make_pool(*mode: str, size: int = 1, max_pending: int = 8, timeout: float = 5.0) -> EnginePool:
+    return EnginePool(
+        path=[sys.executable, FAKE_ENGINE, *mode],
+        size=size,
+        max_pending=max_pending,
+        timeout=timeout,
+        options={},
+    )
+
+
+async def wait_idle(pool: EnginePool, count: int):
+    """Wait for background replacements to put engines back in the pool"""
+    for _ in range(100):
+        if pool._idle.qsize() >= count:
+            return
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"{pool._idle.qsize()} idle engines, expected {count}")
+
+
+def test_play_returns_a_legal_move():
+    async def run():
+        pool = make_pool(size=2)
+        await pool.start()
+        try:
+            assert pool.available
+            board = chess.Board()
+            board.push_uci("e2e4")
+            moves = await asyncio.gather(*(pool.play(board.fen(), 5) for _ in range(4)))
+            assert all(chess.Move.from_uci(move) in board.legal_moves for move in moves)
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+
+def test_busy_when_pending_limit_reached():
+    async def run():
+        pool = make_pool("hang", max_pending=1, timeout=2.0)
+        await pool.start()
+        try:
+            searching = asyncio.create_task(pool.play(chess.STARTING_FEN, 5))
+            await asyncio.sleep(0.1)
+            with pytest.raises(EnginePoolBusy):
+                await pool.play(chess.STARTING_FEN, 5)
+            searching.cancel()
+            await asyncio.gather(searching, return_exceptions=True)
+        finally:
+            await wait_idle(pool, 1)
+            await pool.close()
+
+    asyncio.run(run())
+
+
+def test_timed_out_engine_is_replaced():
+    async def run():
+        pool = make_pool("hang", timeout=0.3)
+        await pool.start()
+        try:
+            with pytest.raises(TimeoutError):
+                await pool.play(chess.STARTING_FEN, 5)
+            await wait_idle(pool, 1)
+            assert pool.available
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+
+def test_crashed_engine_is_restarted(tmp_path):
+    async def run():
+        pool = make_pool("crash-once", str(tmp_path / "crashed"))
+        await pool.start()
+        try:
+            with pytest.raises(chess.engine.EngineError):
+                await pool.play(chess.STARTING_FEN, 5)
+            await wait_idle(pool, 1)
+            move = await pool.play(chess.STARTING_FEN, 5)
+            assert chess.Move.from_uci(move) in chess.Board().legal_moves
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+
+def test_no_engine_when_binary_is_missing(tmp_path):
+    async def run():
+        pool = EnginePool(str(tmp_path / "missing"), size=1, max_pending=1, timeout=1.0, options={})
+        await pool.start()
+        assert not pool.available
+
+    asyncio.run(run())